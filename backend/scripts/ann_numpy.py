@@ -0,0 +1,179 @@
+import sys
+import os
+import json
+import hashlib
+import numpy as np
+
+# TensorFlow-free inference for the Dense/BatchNormalization/Dropout MLP built by
+# train_ann.build_best_model.
+#
+# export_ann_weights() reads the Keras .h5 with h5py only, folds every
+# BatchNormalization layer into the Dense layer that follows it (dropout is a
+# no-op at inference) and saves the remaining Dense stack as a small .npz.
+# NumpyANN runs the float32 forward pass with the same predict() shape as Keras.
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+}
+
+def npz_path_for(h5_path):
+    return os.path.splitext(h5_path)[0] + ".npz"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _layer_weights(group):
+    # Weights in the order Keras saved them, keyed by short name (kernel, bias, gamma, ...)
+    weights = {}
+    for name in group.attrs["weight_names"]:
+        name = name.decode() if isinstance(name, bytes) else name
+        short = name.split("/")[-1].split(":")[0]
+        weights[short] = np.asarray(group[name], dtype=np.float64)
+    return weights
+
+def _model_layers(h5_file):
+    config = json.loads(h5_file.attrs["model_config"])
+    layers = config["config"]
+    if isinstance(layers, dict):
+        layers = layers["layers"]
+    return [(layer["class_name"], layer["config"]) for layer in layers]
+
+def export_ann_weights(h5_path, npz_path=None):
+    import h5py
+
+    npz_path = npz_path or npz_path_for(h5_path)
+    dense_layers = []
+    scale, shift = None, None  # pending BatchNormalization affine on the next Dense input
+
+    with h5py.File(h5_path, "r") as f:
+        model_weights = f["model_weights"]
+
+        for class_name, config in _model_layers(f):
+            if class_name in ("InputLayer", "Dropout"):
+                continue
+
+            weights = _layer_weights(model_weights[config["name"]])
+
+            if class_name == "BatchNormalization":
+                gamma = weights.get("gamma", np.ones_like(weights["moving_mean"]))
+                beta = weights.get("beta", np.zeros_like(weights["moving_mean"]))
+                s = gamma / np.sqrt(weights["moving_variance"] + config["epsilon"])
+                t = beta - weights["moving_mean"] * s
+                # Two BN layers in a row compose into one affine
+                if scale is not None:
+                    s, t = scale * s, shift * s + t
+                scale, shift = s, t
+
+            elif class_name == "Dense":
+                kernel = weights["kernel"]
+                bias = weights.get("bias", np.zeros(kernel.shape[1]))
+                if scale is not None:
+                    # dense(x * s + t) == x @ (s[:, None] * W) + (t @ W + b)
+                    bias = bias + shift @ kernel
+                    kernel = scale[:, None] * kernel
+                    scale, shift = None, None
+
+                activation = config.get("activation", "linear")
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation '{activation}' in layer {config['name']}")
+                dense_layers.append((kernel, bias, activation))
+
+            else:
+                raise ValueError(f"Unsupported layer type '{class_name}' in {h5_path}")
+
+    if scale is not None:
+        raise ValueError("BatchNormalization after the last Dense layer cannot be folded")
+
+    arrays = {
+        "activations": np.array([act for _, _, act in dense_layers]),
+        "source_sha256": np.array(file_sha256(h5_path)),
+    }
+    for i, (kernel, bias, _) in enumerate(dense_layers):
+        arrays[f"kernel_{i}"] = kernel.astype(np.float32)
+        arrays[f"bias_{i}"] = bias.astype(np.float32)
+    np.savez(npz_path, **arrays)
+    return npz_path
+
+class NumpyANN:
+    def __init__(self, kernels, biases, activations):
+        self.kernels = kernels
+        self.biases = biases
+        self.activations = activations
+
+    def predict(self, X, batch_size=8192, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((X.shape[0], self.kernels[-1].shape[1]), dtype=np.float32)
+        for start in range(0, X.shape[0], batch_size):
+            h = X[start:start + batch_size]
+            for kernel, bias, activation in zip(self.kernels, self.biases, self.activations):
+                h = ACTIVATIONS[activation](h @ kernel + bias)
+            out[start:start + batch_size] = h
+        return out
+
+def load_numpy_ann(npz_path):
+    with np.load(npz_path) as data:
+        activations = [str(act) for act in data["activations"]]
+        kernels = [data[f"kernel_{i}"] for i in range(len(activations))]
+        biases = [data[f"bias_{i}"] for i in range(len(activations))]
+    return NumpyANN(kernels, biases, activations)
+
+def is_current(npz_path, h5_path):
+    # The export is only valid for the exact .h5 it was built from
+    if not os.path.exists(npz_path):
+        return False
+    with np.load(npz_path) as data:
+        if "source_sha256" not in data:
+            return False
+        return str(data["source_sha256"]) == file_sha256(h5_path)
+
+def load_ann(h5_path):
+    """
+    Load the ANN for inference, preferring the folded NumPy export next to the
+    .h5 file. The export is (re)built when missing or stale; Keras is only
+    imported when h5py is not available to build it.
+    """
+    npz_path = npz_path_for(h5_path)
+    if not is_current(npz_path, h5_path):
+        try:
+            export_ann_weights(h5_path, npz_path)
+        except ImportError:
+            from tensorflow.keras.models import load_model
+            return load_model(h5_path)
+    return load_numpy_ann(npz_path)
+
+def check_parity(h5_path, npz_path, n_samples=2048, seed=42):
+    # Compare against Keras on random MinMax-scaled inputs (needs TensorFlow)
+    from tensorflow.keras.models import load_model
+
+    keras_model = load_model(h5_path)
+    numpy_model = load_numpy_ann(npz_path)
+    n_features = numpy_model.kernels[0].shape[0]
+
+    X = np.random.default_rng(seed).random((n_samples, n_features), dtype=np.float32)
+    expected = keras_model.predict(X, verbose=0)
+    actual = numpy_model.predict(X)
+    max_abs = float(np.max(np.abs(expected - actual)))
+    max_rel = float(np.max(np.abs(expected - actual) / np.maximum(np.abs(expected), 1e-6)))
+    return max_abs, max_rel
+
+if __name__ == "__main__":
+    # Usage: python ann_numpy.py <model.h5> [output.npz] [--check]
+    args = [a for a in sys.argv[1:] if a != "--check"]
+    h5_path = args[0]
+    npz_path = export_ann_weights(h5_path, args[1] if len(args) > 1 else None)
+    print(f"✅ Exported folded ANN weights to {npz_path}")
+
+    if "--check" in sys.argv:
+        max_abs, max_rel = check_parity(h5_path, npz_path)
+        print(f"🔍 Keras vs NumPy: max abs diff {max_abs:.6g}, max rel diff {max_rel:.3g}")
+        if max_rel > 1e-4:
+            print("❌ Parity check failed")
+            sys.exit(1)
+        print("✅ Parity check passed")
@@ -1,4 +1,5 @@
 import pandas as pd
+from dataset_cache import read_dataset
 import json
 import numpy as np
 import sys
@@ -7,8 +8,8 @@ import sys
 city = sys.argv[1]
 
 # Load your CSV files
-predictions_df = pd.read_csv(f'D:/FYPs/ffyypp/ffyypp/backend/predictionResult/EL PASO_hybrid_result.csv')
-actual_df = pd.read_csv('D:/FYPs/ffyypp/ffyypp/backend/validationData/EL PASO_ValidationData.csv')
+predictions_df = read_dataset(f'D:/FYPs/ffyypp/ffyypp/backend/predictionResult/EL PASO_hybrid_result.csv')
+actual_df = read_dataset('D:/FYPs/ffyypp/ffyypp/backend/validationData/EL PASO_ValidationData.csv')
 
 # Extract relevant columns
 predictions = predictions_df['Ensemble_Predicted_Demand']
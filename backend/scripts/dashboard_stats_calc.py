@@ -1,6 +1,7 @@
 import sys
 import os
 import pandas as pd
+from dataset_cache import read_dataset
 import json
 
 def calculate_consumption_summary(city):
@@ -11,7 +12,7 @@ def calculate_consumption_summary(city):
         return
 
     try:
-        df = pd.read_csv(file_path)
+        df = read_dataset(file_path)
         df.columns = df.columns.str.strip()  # Clean column names
 
         if 'Ensemble_Predicted_Demand' not in df.columns or 'DATE' not in df.columns:
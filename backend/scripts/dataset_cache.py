@@ -0,0 +1,124 @@
+import sys
+import os
+import json
+import time
+import hashlib
+import tempfile
+import pandas as pd
+import numpy as np
+from feature_schema import FEATURE_DTYPES, compact_column
+
+# Typed columnar cache for the city / training / validation / test /
+# prediction CSVs.
+#
+# The first read of a CSV parses it once, applies the dataset schema
+# (datetime64 DATE, the feature dtypes from feature_schema, float32 dew point
+# and demand) and writes a Feather copy under datasetCache/. Later reads load
+# the Feather file directly as long as the source CSV and the schema have not
+# changed (mtime + size, or a content hash with validate="hash"). Without
+# pyarrow every read falls back to pd.read_csv with the same schema applied.
+
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+CACHE_DIR = f"{BASE_DIR}/datasetCache"
+
+DATE_COLUMNS = ["DATE"]
+COLUMN_DTYPES = dict(FEATURE_DTYPES, **{"DEW": np.float32, "Demand (MW)": np.float32})
+SCHEMA_VERSION = 2  # bump whenever COLUMN_DTYPES changes so old Feather copies are rebuilt
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+def apply_schema(df):
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    for col, dtype in COLUMN_DTYPES.items():
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = compact_column(df[col], dtype)
+    return df
+
+def _source_marker(path, validate):
+    stat = os.stat(path)
+    marker = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "schema": SCHEMA_VERSION}
+    if validate == "hash":
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        marker["sha256"] = digest.hexdigest()
+    return marker
+
+def cache_paths(path, cache_dir=None):
+    cache_dir = cache_dir or CACHE_DIR
+    source = os.path.abspath(path)
+    tag = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(source))[0].replace(" ", "_")
+    base = os.path.join(cache_dir, f"{name}_{tag}")
+    return base + ".feather", base + ".json"
+
+def _write_atomic(path, write):
+    # write(tmp_path) fills a temp file unique to this call, which then replaces path
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_dataset(path, cache_dir=None, validate="mtime"):
+    """
+    Drop-in replacement for pd.read_csv(path, parse_dates=["DATE"]) on the
+    project's datasets, returning compact dtypes and caching the parsed frame.
+    """
+    if not HAS_PYARROW:
+        return apply_schema(pd.read_csv(path, low_memory=False))
+
+    data_path, meta_path = cache_paths(path, cache_dir)
+    marker = _source_marker(path, validate)
+
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            cached_marker = json.load(f)
+        if all(cached_marker.get(k) == v for k, v in marker.items()):
+            return pd.read_feather(data_path)
+
+    df = apply_schema(pd.read_csv(path, low_memory=False))
+
+    # Several scripts may rebuild the same entry at once: each writes its own temp
+    # files and renames them into place, so readers never see a partial file
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    _write_atomic(data_path, lambda tmp_path: df.reset_index(drop=True).to_feather(tmp_path))
+    if validate != "hash":
+        marker = _source_marker(path, "hash") | marker
+
+    def write_marker(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(marker, f)
+    _write_atomic(meta_path, write_marker)
+    return df
+
+if __name__ == "__main__":
+    # Usage: python dataset_cache.py <file.csv> [<file.csv> ...]
+    # Compares a plain CSV parse against a warm cache read for each file.
+    for path in sys.argv[1:]:
+        started = time.perf_counter()
+        csv_df = pd.read_csv(path, low_memory=False)
+        csv_df["DATE"] = pd.to_datetime(csv_df["DATE"])
+        csv_seconds = time.perf_counter() - started
+
+        read_dataset(path)  # make sure the cache is warm
+        started = time.perf_counter()
+        cached_df = read_dataset(path)
+        cached_seconds = time.perf_counter() - started
+
+        csv_mb = csv_df.memory_usage(deep=True).sum() / 1e6
+        cached_mb = cached_df.memory_usage(deep=True).sum() / 1e6
+        print(f"📄 {path}: read_csv {csv_seconds * 1000:.1f} ms ({csv_mb:.2f} MB) -> "
+              f"cache {cached_seconds * 1000:.1f} ms ({cached_mb:.2f} MB)")
@@ -0,0 +1,38 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Weighted ensemble of independent models.
+#
+# Members are plain `name -> predict(X)` callables. They run side by side on a
+# thread pool (Keras/NumPy and LightGBM both release the GIL inside their
+# native predict), and each member is timed so the slow half is visible.
+
+def run_members(members, X, max_workers=None):
+    """
+    Run every member on X concurrently.
+    Returns {name: (predictions, seconds)} with 1-D predictions.
+    """
+    def timed(predict):
+        started = time.perf_counter()
+        preds = np.asarray(predict(X)).reshape(-1)
+        return preds, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(members)) as pool:
+        futures = {name: pool.submit(timed, predict) for name, predict in members.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+def weighted_ensemble(predictions, weights):
+    # Weights are normalised to sum to 1, so {"ann": 0.6, "lgb": 0.4} == {"ann": 3, "lgb": 2}
+    missing = [name for name in weights if name not in predictions]
+    if missing:
+        raise ValueError(f"No predictions for ensemble members: {missing}")
+    total = float(sum(weights.values()))
+    if total <= 0:
+        raise ValueError("Ensemble weights must sum to a positive number")
+
+    result = None
+    for name, weight in weights.items():
+        term = (weight / total) * predictions[name]
+        result = term if result is None else result + term
+    return result
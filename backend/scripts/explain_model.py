@@ -0,0 +1,166 @@
+import sys
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import argparse
+import numpy as np
+from feature_schema import FEATURES
+from feature_store import training_features
+from forecast_cache import file_digest
+sys.stdout.reconfigure(encoding='utf-8')
+
+# SHAP explanations for the trained models, run as a separate job instead of
+# at the end of training.
+#
+#   python explain_model.py <city> --model ann|lgb [--samples 500]
+#
+# The ANN is explained with shap.GradientExplainer and LightGBM with
+# shap.TreeExplainer. SHAP values and the rendered summary plot are cached
+# under shapCache/ per model/data hash, so re-running for an unchanged model
+# is instant. The latest plot and mean |SHAP| per feature are published to
+# static/shap/ for the dashboard.
+
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+SHAP_DIR = f"{BASE_DIR}/shapCache"
+PUBLISH_DIR = f"{BASE_DIR}/static/shap"
+
+def model_files(city, model_type):
+    if model_type == "ann":
+        return [f"{BASE_DIR}/trainedModels/ann_best_model_optuna_{city}.h5",
+                f"{BASE_DIR}/trainedModels/scaler_{city}.pkl"]
+    return [f"{BASE_DIR}/trainedModels/lgb_optuna_final_model_{city}.pkl"]
+
+def load_sample(city, n_samples, n_background, seed=42):
+    # Explained rows and background rows are drawn from the training data with a fixed seed
+    features = training_features(city)
+    X = features.X[features.rows()]
+
+    rng = np.random.default_rng(seed)
+    sample = X[np.sort(rng.choice(len(X), min(n_samples, len(X)), replace=False))]
+    background = X[rng.choice(len(X), min(n_background, len(X)), replace=False)]
+    return sample, background
+
+def explain_ann(city, X_sample, X_background):
+    import joblib
+    import shap
+    from tensorflow.keras.models import load_model
+
+    h5_path, scaler_path = model_files(city, "ann")
+    scaler = joblib.load(scaler_path)
+    model = load_model(h5_path, compile=False)
+
+    # The ANN sees scaled features; attributions are reported against the raw values
+    explainer = shap.GradientExplainer(model, scaler.transform(X_background))
+    values = explainer.shap_values(scaler.transform(X_sample))
+    base_value = float(np.mean(model.predict(scaler.transform(X_background), verbose=0)))
+    return values, base_value
+
+def explain_lgb(city, X_sample, X_background):
+    import joblib
+    import shap
+
+    model = joblib.load(model_files(city, "lgb")[0])
+    explainer = shap.TreeExplainer(model.booster_)
+    values = explainer.shap_values(X_sample)
+    return values, float(np.ravel(explainer.expected_value)[0])
+
+EXPLAINERS = {
+    "ann": explain_ann,
+    "lgb": explain_lgb,
+}
+
+def as_matrix(values):
+    # Single-output models come back as a 1-element list or with a trailing output axis
+    if isinstance(values, list):
+        values = values[0]
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim == 3:
+        values = values[..., 0]
+    return values
+
+def cache_key(city, model_type, n_samples, n_background):
+    key = {
+        "models": [file_digest(path) for path in model_files(city, model_type)],
+        "data": file_digest(f"{BASE_DIR}/trainingData/{city}_TrainingData.csv"),
+        "samples": n_samples,
+        "background": n_background,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def write_atomic(path, write):
+    # Write to a temp file in the same directory, then rename, so a crash never
+    # leaves a truncated cache entry (or published file) behind
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def render_plot(values, X_sample, png_path):
+    import matplotlib
+    matplotlib.use("Agg")  # never open a window
+    import matplotlib.pyplot as plt
+    import shap
+
+    shap.summary_plot(values, X_sample, feature_names=np.array(FEATURES), show=False)
+    write_atomic(png_path, lambda f: plt.savefig(f, format="png", dpi=150, bbox_inches="tight"))
+    plt.close("all")
+
+def explain(city, model_type, n_samples=500, n_background=100):
+    safe_city = "".join(c if c.isalnum() else "_" for c in city)
+    key = cache_key(city, model_type, n_samples, n_background)
+    base = os.path.join(SHAP_DIR, f"{safe_city}_{model_type}_{key[:16]}")
+    values_path, png_path = base + ".npz", base + ".png"
+
+    # 1. SHAP values (cached per model/data hash)
+    if os.path.exists(values_path):
+        with np.load(values_path) as data:
+            values, X_sample, base_value = data["values"], data["X"], float(data["base_value"])
+        print(f"✅ Reusing cached SHAP values {values_path}")
+    else:
+        X_sample, X_background = load_sample(city, n_samples, n_background)
+        values, base_value = EXPLAINERS[model_type](city, X_sample, X_background)
+        values = as_matrix(values)
+        os.makedirs(SHAP_DIR, exist_ok=True)
+        write_atomic(values_path, lambda f: np.savez(f, values=values, X=X_sample, base_value=base_value))
+        print(f"✅ SHAP values saved to {values_path}")
+
+    # 2. Summary plot (cached next to the values)
+    if not os.path.exists(png_path):
+        render_plot(values, X_sample, png_path)
+
+    # 3. Publish the latest plot and a per-feature summary for the dashboard
+    os.makedirs(PUBLISH_DIR, exist_ok=True)
+    with open(png_path, "rb") as src:
+        write_atomic(os.path.join(PUBLISH_DIR, f"{safe_city}_{model_type}.png"), lambda f: shutil.copyfileobj(src, f))
+    mean_abs = np.abs(values).mean(axis=0)
+    summary = {
+        "city": city,
+        "model": model_type,
+        "modelHash": key,
+        "baseValue": base_value,
+        "plot": f"/static/shap/{safe_city}_{model_type}.png",
+        "importance": sorted(
+            ({"feature": f, "meanAbsShap": float(v)} for f, v in zip(FEATURES, mean_abs)),
+            key=lambda item: item["meanAbsShap"], reverse=True
+        ),
+    }
+    write_atomic(os.path.join(PUBLISH_DIR, f"{safe_city}_{model_type}.json"),
+                 lambda f: f.write(json.dumps(summary, indent=2).encode("utf-8")))
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute and cache SHAP explanations for a trained model")
+    parser.add_argument("city")
+    parser.add_argument("--model", choices=sorted(EXPLAINERS), required=True)
+    parser.add_argument("--samples", type=int, default=500, help="rows to explain")
+    parser.add_argument("--background", type=int, default=100, help="background rows for the ANN explainer")
+    args = parser.parse_args()
+
+    print(json.dumps(explain(args.city, args.model, args.samples, args.background)))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+# Single declaration of the model features and their compact dtypes, shared by
+# train_lightgbm, train_ann, predict_fast, predict_hybrid and the dataset cache.
+
+FEATURES = [
+    "Season", "TMP", "HUMIDITY", "Hour Number", "Weekday", "Month",
+    "Public Holiday", "Wind Speed", "Rainfall/Snowfall"
+]
+
+TARGET = "Demand (MW)"
+
+FEATURE_DTYPES = {
+    "Season": np.int8,             # 1-4
+    "TMP": np.float32,             # deg C
+    "HUMIDITY": np.int8,           # 0-100 %
+    "Hour Number": np.int8,        # 0-23
+    "Weekday": np.int8,            # 1-7
+    "Month": np.int8,              # 1-12
+    "Public Holiday": np.int8,     # 0/1
+    "Wind Speed": np.float32,      # m/s
+    "Rainfall/Snowfall": np.float32,  # mm
+}
+
+# Names LightGBM stores for the features (it replaces spaces when fitting on a DataFrame)
+LGB_FEATURE_NAMES = [f.replace(" ", "_") for f in FEATURES]
+
+def compact_column(values, dtype):
+    # Integer dtypes are only used when lossless; anything else falls back to float32
+    dtype = np.dtype(dtype)
+    if dtype.kind == "i":
+        info = np.iinfo(dtype)
+        if values.notna().all() and values.between(info.min, info.max).all() and (values % 1 == 0).all():
+            return values.astype(dtype)
+        return values.astype(np.float32)
+    return values.astype(dtype)
+
+def enforce_feature_dtypes(df, features=FEATURES):
+    for col in features:
+        if col in FEATURE_DTYPES and col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = compact_column(df[col], FEATURE_DTYPES[col])
+    return df
+
+def feature_matrix(df, features=FEATURES):
+    """
+    Contiguous float32 (n_rows, n_features) matrix for model input, built in
+    one pass so `predict`/`fit` do not convert the frame again.
+    """
+    X = np.empty((len(df), len(features)), dtype=np.float32)
+    for i, col in enumerate(features):
+        X[:, i] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+    return X
@@ -0,0 +1,175 @@
+import sys
+import os
+import json
+import time
+import hashlib
+import tempfile
+import numpy as np
+from dataset_cache import read_dataset
+from feature_schema import FEATURES, FEATURE_DTYPES, TARGET, feature_matrix
+
+# Versioned feature store for the training matrices.
+#
+# materialize() parses a dataset CSV once and writes, under
+# featureStore/<name>_<version>/:
+#   X.npy      float32 (rows, len(FEATURES)) model matrix, C-contiguous
+#   y.npy      float32 target
+#   dates.npy  datetime64[ns], rows sorted by DATE
+#   Demand_lag24.npy / Demand_roll24.npy   derived with vectorised NumPy
+#   complete.npy   bool, rows with no missing value in any CSV column (dropna)
+#   manifest.json  feature definition, source file marker, row count
+# The version is a hash of FEATURE_DEFINITION, so changing a feature gives a
+# new directory and never reuses an old matrix. load_features() memory-maps the
+# arrays; it re-materializes when the source CSV changed.
+
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+STORE_DIR = f"{BASE_DIR}/featureStore"
+
+LAG_HOURS = 24
+ROLL_HOURS = 24
+
+FEATURE_DEFINITION = {
+    "features": FEATURES,
+    "dtypes": {col: np.dtype(dtype).name for col, dtype in FEATURE_DTYPES.items()},
+    "target": TARGET,
+    "derived": {"Demand_lag24": ["lag", LAG_HOURS], "Demand_roll24": ["rolling_mean", ROLL_HOURS]},
+    "sort": "DATE",
+    "complete": "no missing value in any source column",
+}
+FEATURE_VERSION = hashlib.sha256(json.dumps(FEATURE_DEFINITION, sort_keys=True).encode("utf-8")).hexdigest()
+
+def lag(values, hours):
+    # values shifted down by `hours` rows, NaN at the top (Series.shift)
+    out = np.full(len(values), np.nan, dtype=np.float64)
+    if hours < len(values):
+        out[hours:] = values[:len(values) - hours]
+    return out
+
+def rolling_mean(values, window):
+    # Mean of the last `window` rows, NaN until the window is full (Series.rolling(window).mean())
+    out = np.full(len(values), np.nan, dtype=np.float64)
+    if window <= len(values):
+        # Running sums over the finite values, plus a running count of gaps so a
+        # window containing a NaN stays NaN instead of poisoning every later window
+        finite = np.isfinite(values)
+        cumsum = np.cumsum(np.concatenate(([0.0], np.where(finite, values, 0.0).astype(np.float64))))
+        gaps = np.cumsum(np.concatenate(([0], ~finite)))
+        sums = (cumsum[window:] - cumsum[:-window]) / window
+        sums[(gaps[window:] - gaps[:-window]) > 0] = np.nan
+        out[window - 1:] = sums
+    return out
+
+DERIVED = {
+    "lag": lag,
+    "rolling_mean": rolling_mean,
+}
+
+def _source_marker(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def store_path(csv_path, store_dir=None):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    safe_name = "".join(c if c.isalnum() else "_" for c in name)
+    return os.path.join(store_dir or STORE_DIR, f"{safe_name}_{FEATURE_VERSION[:12]}")
+
+def _write_atomic(path, write):
+    # Write to a temp file of our own in the same directory, then rename, so a
+    # reader never sees a half-written file and concurrent writers (lgb and ann
+    # training the same city) never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _save(directory, name, array):
+    _write_atomic(os.path.join(directory, f"{name}.npy"), lambda f: np.save(f, array))
+
+def materialize(csv_path, store_dir=None):
+    started = time.perf_counter()
+    df = read_dataset(csv_path).sort_values("DATE", ignore_index=True)
+    target = df[TARGET].to_numpy(dtype=np.float32)
+
+    directory = store_path(csv_path, store_dir)
+    os.makedirs(directory, exist_ok=True)
+    _save(directory, "X", feature_matrix(df, FEATURES))
+    _save(directory, "y", target)
+    _save(directory, "dates", df["DATE"].to_numpy(dtype="datetime64[ns]"))
+    for name, (kind, hours) in FEATURE_DEFINITION["derived"].items():
+        _save(directory, name, DERIVED[kind](target, hours))
+    _save(directory, "complete", df.notna().all(axis=1).to_numpy())
+
+    # The manifest goes last: its presence means the arrays are complete
+    manifest = {
+        "version": FEATURE_VERSION,
+        "definition": FEATURE_DEFINITION,
+        "source": _source_marker(csv_path),
+        "rows": len(df),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    _write_atomic(os.path.join(directory, "manifest.json"),
+                  lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")))
+    return directory
+
+class FeatureSet:
+    """
+    Memory-mapped arrays of one materialized dataset. rows() selects the rows
+    a model can train on (finite features/target plus any derived columns it needs;
+    complete=True also drops rows missing any other CSV column, like DataFrame.dropna()).
+    """
+
+    def __init__(self, directory, mmap_mode="r"):
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        load = lambda name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        self.X = load("X")
+        self.y = load("y")
+        self.dates = load("dates")
+        self.derived = {name: load(name) for name in self.manifest["definition"]["derived"]}
+        self.complete = load("complete")
+
+    def rows(self, require=(), complete=False):
+        mask = np.isfinite(self.X).all(axis=1) & np.isfinite(self.y)
+        for name in require:
+            mask &= np.isfinite(self.derived[name])
+        if complete:
+            mask &= self.complete
+        return mask
+
+def load_features(csv_path, store_dir=None, mmap_mode="r"):
+    directory = store_path(csv_path, store_dir)
+    manifest_path = os.path.join(directory, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == FEATURE_VERSION and manifest.get("source") == _source_marker(csv_path):
+            return FeatureSet(directory, mmap_mode)
+    return FeatureSet(materialize(csv_path, store_dir), mmap_mode)
+
+def training_features(city, store_dir=None, mmap_mode="r"):
+    return load_features(f"{BASE_DIR}/trainingData/{city}_TrainingData.csv", store_dir, mmap_mode)
+
+if __name__ == "__main__":
+    # Usage: python feature_store.py <file.csv> [<file.csv> ...]
+    # Materializes each file and compares a CSV parse against a memory-mapped load.
+    import pandas as pd
+
+    for path in sys.argv[1:]:
+        directory = materialize(path)
+
+        started = time.perf_counter()
+        df = pd.read_csv(path, low_memory=False)
+        df[FEATURES].to_numpy(dtype=np.float32)
+        csv_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        features = load_features(path)
+        X = np.asarray(features.X[features.rows()])
+        store_seconds = time.perf_counter() - started
+        print(f"📄 {path}: read_csv {csv_seconds * 1000:.1f} ms -> feature store {store_seconds * 1000:.1f} ms "
+              f"({X.shape[0]} rows, {directory})")
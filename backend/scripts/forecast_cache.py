@@ -0,0 +1,114 @@
+import os
+import glob
+import json
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Content-addressed cache of full-horizon forecasts.
+#
+# A forecast is keyed on the city, the model type, the SHA-256 of every model
+# artifact and input data file, and the forecast parameters. Any change to a
+# model or to the data gives a new key, so a stale forecast is never served.
+# Entries are stored as one .npz per key (one array per column, plus a null
+# mask for text columns with missing values) and date-range requests are
+# answered by slicing the cached frame.
+
+_digests = {}
+
+def file_digest(path):
+    # Memoised on (mtime, size) so a warm worker does not re-hash unchanged files
+    stat = os.stat(path)
+    marker = (stat.st_mtime_ns, stat.st_size)
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == marker:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    _digests[path] = (marker, digest.hexdigest())
+    return digest.hexdigest()
+
+def forecast_key(city, model_type, model_files, data_files, params=None):
+    key = {
+        "city": city,
+        "modelType": model_type,
+        "models": [file_digest(path) for path in model_files],
+        "data": [file_digest(path) for path in data_files],
+        "params": params or {},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _city_prefix(city):
+    # Readable name plus a hash of the raw name: "EL PASO" and "EL_PASO" must not
+    # share a prefix, or storing one would clean up the other's entries
+    safe_name = "".join(c if c.isalnum() else "_" for c in city)
+    return f"{safe_name}_{hashlib.sha256(city.encode('utf-8')).hexdigest()[:8]}"
+
+def cache_path(cache_dir, city, model_type, key):
+    return os.path.join(cache_dir, f"{_city_prefix(city)}_{model_type}_{key[:32]}.npz")
+
+def load_forecast(cache_dir, city, model_type, key):
+    path = cache_path(cache_dir, city, model_type, key)
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as data:
+        columns = [str(c) for c in data["columns"]]
+        dtypes = [str(d) for d in data["dtypes"]]
+        frame = {}
+        for i, (col, dtype) in enumerate(zip(columns, dtypes)):
+            values = pd.Series(data[f"col_{i}"], copy=False)
+            if f"null_{i}" in data.files:
+                values = values.astype(object)
+                values[data[f"null_{i}"]] = np.nan
+            frame[col] = values.astype(dtype)
+    return pd.DataFrame(frame, columns=columns)
+
+def store_forecast(cache_dir, city, model_type, key, df):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(cache_dir, city, model_type, key)
+
+    arrays = {
+        "columns": np.array([str(c) for c in df.columns]),
+        "dtypes": np.array([str(df[c].dtype) for c in df.columns]),
+    }
+    for i, col in enumerate(df.columns):
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            # Text is stored as fixed-width strings; missing values get a mask
+            # so they come back as NaN instead of the string "nan"
+            nulls = pd.isna(values)
+            if nulls.any():
+                arrays[f"null_{i}"] = nulls
+                values = np.where(nulls, "", values)
+            values = values.astype(str)
+        arrays[f"col_{i}"] = values
+
+    # Write to a temp file of our own first, so a concurrent reader never sees half
+    # an entry and the CLI and the worker storing the same key never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Older entries for this city/model can never be hit again
+    pattern = os.path.join(cache_dir, f"{_city_prefix(city)}_{model_type}_*.npz")
+    for old_path in glob.glob(pattern):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass  # another writer removed it first
+    return path
+
+def slice_by_date(df, start_date, end_date, time_col="DATE"):
+    return df[(df[time_col] >= start_date) & (df[time_col] <= end_date)]
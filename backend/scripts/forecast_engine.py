@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+LAG_FEATURE = "Demand_lag24"
+ROLL_FEATURE = "Demand_roll24"
+
+
+class LagState:
+    """
+    Fixed-size ring buffer holding the last `lag_hours` demand values.
+
+    Replaces the per-step `shift`/`rolling` recomputation over a growing
+    history frame: the lag value and the rolling mean are read in O(1)
+    and updated incrementally every time a new demand value is pushed.
+    """
+
+    def __init__(self, lag_hours, history=()):
+        self.size = lag_hours
+        self.buffer = np.full(lag_hours, np.nan, dtype=np.float64)
+        self.pos = 0      # next write slot (== oldest value once full)
+        self.count = 0
+        self.total = 0.0  # sum of non-NaN values in the buffer
+        self.valid = 0    # number of non-NaN values in the buffer
+
+        for value in list(history)[-lag_hours:]:
+            self.push(value)
+
+    def is_full(self):
+        return self.count == self.size
+
+    def lag(self):
+        # Same as shift(lag_hours): value from exactly lag_hours steps back
+        if not self.is_full():
+            return np.nan
+        return self.buffer[self.pos]
+
+    def upcoming_lags(self, k):
+        # Lag values for the next k steps (k <= lag_hours). These only reach
+        # back into what is already in the buffer, so they are known before
+        # any of the k steps is predicted.
+        if k > self.size:
+            raise ValueError(f"Cannot look ahead {k} steps with a {self.size}-hour lag")
+        if self.is_full():
+            history = np.roll(self.buffer, -self.pos)
+        else:
+            history = self.buffer[:self.count]
+
+        idx = np.arange(k) + self.count - self.size
+        lags = np.full(k, np.nan, dtype=np.float64)
+        known = idx >= 0
+        lags[known] = history[idx[known]]
+        return lags
+
+    def roll(self, current=np.nan):
+        # Same as rolling(window=lag_hours, min_periods=1).mean() over the
+        # last lag_hours - 1 history values plus the current row
+        total, valid = self.total, self.valid
+        if self.is_full():
+            oldest = self.buffer[self.pos]
+            if not np.isnan(oldest):
+                total -= oldest
+                valid -= 1
+        if not np.isnan(current):
+            total += current
+            valid += 1
+        return total / valid if valid else np.nan
+
+    def push(self, value):
+        value = float(value)
+        if self.is_full():
+            oldest = self.buffer[self.pos]
+            if not np.isnan(oldest):
+                self.total -= oldest
+                self.valid -= 1
+        else:
+            self.count += 1
+
+        self.buffer[self.pos] = value
+        if not np.isnan(value):
+            self.total += value
+            self.valid += 1
+        self.pos = (self.pos + 1) % self.size
+
+
+def safe_block_size(features, lag_hours, horizon):
+    """
+    Widest number of consecutive hours that can go through a single
+    `model.predict` call without needing a prediction from the same block.
+
+    - rolling mean feature: depends on the previous hour -> 1
+    - lag feature only: the next `lag_hours` hours only reach known values
+    - no demand-derived features: the whole horizon is independent
+    """
+    if ROLL_FEATURE in features:
+        return 1
+    if LAG_FEATURE in features:
+        return lag_hours
+    return max(horizon, 1)
+
+
+def recursive_forecast(
+    model,
+    bridge_df,
+    future_df,
+    features,
+    time_col="DATE",
+    demand_col="Demand (MW)",
+    lag_hours=24,
+    block_size=None
+):
+    """
+    Recursive one-step-ahead forecast where every prediction is fed back as
+    the demand history for the following hours.
+
+    `bridge_df` holds the last known (actual) hours before `future_df`. Lag
+    and rolling-mean state live in a `LagState` ring buffer and predictions
+    are written into preallocated arrays, so each step costs the same no
+    matter how long the horizon is.
+
+    Hours are predicted in blocks of `block_size` rows per `model.predict`
+    call. By default the widest safe block is picked from the features
+    (see `safe_block_size`); a larger `block_size` is clamped to it, and
+    `block_size=1` gives the plain step-by-step loop.
+    """
+    # 1. Align future rows to the bridge columns in a single concat
+    frame = pd.concat([bridge_df, future_df], ignore_index=True)
+    frame = frame.iloc[len(bridge_df):].reset_index(drop=True)
+    if demand_col not in frame.columns:
+        frame[demand_col] = np.nan
+    for col in (LAG_FEATURE, ROLL_FEATURE):
+        if col not in frame.columns:
+            frame[col] = np.nan
+
+    # 2. Seed the ring buffer with the bridge demand values
+    history = bridge_df[demand_col].to_numpy(dtype=np.float64) if demand_col in bridge_df.columns else []
+    state = LagState(lag_hours, history)
+
+    # 3. Preallocate the model input and output arrays
+    n = len(frame)
+    X = frame[features].to_numpy(dtype=np.float64, copy=True)
+    current = frame[demand_col].to_numpy(dtype=np.float64)
+    lag_idx = features.index(LAG_FEATURE) if LAG_FEATURE in features else None
+    roll_idx = features.index(ROLL_FEATURE) if ROLL_FEATURE in features else None
+
+    preds = np.empty(n, dtype=np.float64)
+    lags = np.empty(n, dtype=np.float64)
+    rolls = np.empty(n, dtype=np.float64)
+
+    max_block = safe_block_size(features, lag_hours, n)
+    block_size = max_block if block_size is None else max(1, min(block_size, max_block))
+
+    # 4. Step through the horizon one block at a time
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+
+        if lag_idx is not None:
+            # block_size <= lag_hours whenever the lag is a feature
+            X[start:stop, lag_idx] = state.upcoming_lags(stop - start)
+        if roll_idx is not None:
+            # block_size is 1 whenever the rolling mean is a feature
+            X[start, roll_idx] = state.roll(current[start])
+
+        preds[start:stop] = model.predict(X[start:stop])
+
+        for i in range(start, stop):
+            lags[i] = state.lag()
+            rolls[i] = state.roll(current[i])
+            state.push(preds[i])
+
+    # 5. Attach predictions in the same layout as the old per-row frames
+    frame[demand_col] = preds
+    frame[LAG_FEATURE] = lags
+    frame[ROLL_FEATURE] = rolls
+    frame["Predicted Demand"] = preds
+
+    frame.sort_values(time_col, inplace=True)
+    frame.reset_index(drop=True, inplace=True)
+    return frame
+
+
+def forecast_window(
+    model,
+    bridge_df,
+    future_df,
+    features,
+    start_date,
+    end_date,
+    time_col="DATE",
+    demand_col="Demand (MW)",
+    lag_hours=24,
+    block_size=None
+):
+    """
+    Same rows as `recursive_forecast(...)` filtered to [start_date, end_date],
+    without forecasting hours the window does not depend on.
+
+    Hours after the window are never needed. Hours before it are only needed
+    when demand feeds back into the features; otherwise only the `lag_hours`
+    just before the window are predicted, to fill its lag/rolling columns.
+    `future_df` must be sorted by `time_col` with one row per hour.
+    """
+    times = future_df[time_col]
+    in_window = ((times >= start_date) & (times <= end_date)).to_numpy()
+    if not in_window.any():
+        raise ValueError(f"No rows to forecast between {start_date} and {end_date}")
+
+    first = int(np.argmax(in_window))
+    last = len(in_window) - 1 - int(np.argmax(in_window[::-1]))
+
+    if LAG_FEATURE in features or ROLL_FEATURE in features:
+        lo = 0
+    else:
+        lo = max(first - lag_hours, 0)
+
+    # Past the start of the horizon the real bridge is never reached, but an
+    # empty one keeps the frame columns identical to a full run
+    bridge = bridge_df if lo == 0 else bridge_df.iloc[:0]
+    result = recursive_forecast(
+        model=model,
+        bridge_df=bridge,
+        future_df=future_df.iloc[lo:last + 1],
+        features=features,
+        time_col=time_col,
+        demand_col=demand_col,
+        lag_hours=lag_hours,
+        block_size=block_size
+    )
+    window = (result[time_col] >= start_date) & (result[time_col] <= end_date)
+    return result[window].reset_index(drop=True)
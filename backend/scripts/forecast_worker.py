@@ -0,0 +1,119 @@
+import sys
+import os
+import io
+import json
+import time
+import importlib
+import contextlib
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Long-lived forecasting worker used by server.js instead of spawning a fresh
+# predict_fast.py / predict_hybrid.py per request.
+#
+# Protocol: one JSON request per line on stdin, one JSON response per line on
+# stdout.
+#   request:  {"id": 1, "modelType": "hybrid", "cityName": "EL PASO",
+#              "startDate": "2024-03-01", "endDate": "2024-03-07"}
+#   response: {"id": 1, "ok": true, "summary": {...}, "output": "...",
+#              "reloaded": false, "seconds": 0.42}
+# `output` is exactly what the standalone script would have printed.
+#
+# A cache miss only forecasts the requested range. Once the response is
+# written, the worker fills that city's full-horizon forecast cache (and the
+# result CSV) before it reads the next request, so later ranges are sliced.
+
+SCRIPTS = {
+    "fast": "predict_fast",
+    "hybrid": "predict_hybrid",
+}
+
+def file_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+class ModelCache:
+    """
+    Keeps loaded models per (model type, city) and reloads them only when
+    one of the model files changes on disk.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, script, model_type, city):
+        key = (model_type, city)
+        signature = file_signature(script.model_files(city))
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[1], False
+
+        models = script.load_models(city)
+        self.entries[key] = (signature, models)
+        return models, True
+
+def handle_request(request, cache):
+    model_type = request.get("modelType")
+    if model_type not in SCRIPTS:
+        raise ValueError(f"Invalid model type: {model_type}")
+
+    city = request["cityName"]
+    start_date = request["startDate"]
+    end_date = request["endDate"]
+
+    # Scripts are imported on first use so a fast-only worker never pays for TensorFlow
+    script = importlib.import_module(SCRIPTS[model_type])
+
+    started = time.perf_counter()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        models, reloaded = cache.get(script, model_type, city)
+        summary = script.run_prediction(city, start_date, end_date, models)
+        print(json.dumps(summary))
+        script.store_summary(city, summary)
+
+    return {
+        "summary": summary,
+        "output": output.getvalue(),
+        "reloaded": reloaded,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def fill_cache(request, cache):
+    # Best effort: a failure here must not affect the request already answered
+    try:
+        script = importlib.import_module(SCRIPTS[request["modelType"]])
+        with contextlib.redirect_stdout(io.StringIO()):
+            models, _ = cache.get(script, request["modelType"], request["cityName"])
+            script.fill_cache(request["cityName"], models)
+    except Exception as e:
+        print(f"⚠️ Could not fill the forecast cache: {e}", file=sys.stderr)
+
+def serve(stdin=sys.stdin, stdout=sys.stdout):
+    cache = ModelCache()
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, "ok": True}
+            response.update(handle_request(request, cache))
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e)}
+
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+        if response["ok"]:
+            fill_cache(request, cache)
+
+if __name__ == "__main__":
+    serve()
@@ -1,5 +1,6 @@
 # scripts/holiday_analysis.py
 import pandas as pd
+from dataset_cache import read_dataset
 import sys
 import json
 
@@ -7,9 +8,10 @@ import json
 city = sys.argv[1]
 file_path = f"D:/FYPs/ffyypp/ffyypp/backend/city/EL PASO.csv"
 
-df = pd.read_csv(file_path)
+df = read_dataset(file_path)
 df['DATE'] = pd.to_datetime(df['DATE'])
 df.sort_values('DATE', inplace=True)
+df['Demand (MW)'] = df['Demand (MW)'].astype(float)  # average in float64, the cache stores float32
 
 # Group by Public Holiday and calculate average demand
 holiday_avg = df.groupby('Public Holiday')['Demand (MW)'].mean()
@@ -0,0 +1,61 @@
+import sys
+import os
+import json
+import time
+import subprocess
+import pandas as pd
+from training_events import peak_rss_mb
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Column-pruned reader for NOAA ISD global-hourly CSVs.
+#
+# A station-year file has 100+ mostly empty string columns, but the weather
+# pipeline only uses the ones in ISD_COLUMNS. read_isd() parses just those,
+# as strings (no per-column type inference), in chunks, so the full-width
+# frame never exists in memory.
+#
+#   python isd_reader.py --bench <file.csv> [...]   full read_csv vs pruned, per file
+
+ISD_COLUMNS = ["DATE", "TMP", "DEW", "WND", "AA1"]
+ISD_DTYPES = {column: str for column in ISD_COLUMNS}
+CHUNK_ROWS = 100_000
+
+def read_isd(path, columns=ISD_COLUMNS, chunksize=CHUNK_ROWS):
+    # Columns missing from a file (AA1 is absent for some station-years) come back as NA
+    wanted = set(columns)
+    chunks = [
+        chunk for chunk in pd.read_csv(path, usecols=lambda c: c in wanted, dtype=ISD_DTYPES, chunksize=chunksize)
+    ]
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    for column in columns:
+        if column not in df.columns:
+            df[column] = pd.NA
+    return df[columns]
+
+def frame_mb(df):
+    return round(df.memory_usage(deep=True).sum() / 1e6, 1)
+
+def _measure(mode, path):
+    # Runs in a fresh process so the peak RSS belongs to this one parse
+    started = time.perf_counter()
+    df = pd.read_csv(path, low_memory=False) if mode == "full" else read_isd(path)
+    print(json.dumps({"mode": mode, "rows": len(df), "columns": df.shape[1], "seconds": round(time.perf_counter() - started, 3),
+                      "frameMb": frame_mb(df), "peakRssMb": peak_rss_mb()}))
+
+def bench(paths):
+    for path in paths:
+        runs = {}
+        for mode in ("full", "pruned"):
+            output = subprocess.run([sys.executable, __file__, "--measure", mode, path],
+                                    capture_output=True, text=True, check=True).stdout
+            runs[mode] = json.loads(output.strip().splitlines()[-1])
+        full, pruned = runs["full"], runs["pruned"]
+        print(f"📄 {os.path.basename(path)} ({full['rows']} rows): "
+              f"read_csv {full['columns']} cols {full['seconds']}s, frame {full['frameMb']} MB, peak RSS {full['peakRssMb']} MB -> "
+              f"pruned {pruned['columns']} cols {pruned['seconds']}s, frame {pruned['frameMb']} MB, peak RSS {pruned['peakRssMb']} MB")
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--measure":
+        _measure(sys.argv[2], sys.argv[3])
+    elif sys.argv[1] == "--bench":
+        bench(sys.argv[2:])
@@ -0,0 +1,246 @@
+import sys
+import os
+import json
+import time
+import shutil
+import hashlib
+import datetime
+import numpy as np
+from feature_schema import FEATURES, FEATURE_DTYPES
+from ann_numpy import export_ann_weights, load_numpy_ann, file_sha256
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Model artifact registry.
+#
+# Every registered model is stored in the format that loads fastest without
+# sklearn or TensorFlow:
+#   lightgbm -> model.txt     (native LightGBM booster, loaded with lgb.Booster)
+#   ann      -> weights.npz   (BatchNormalization folded, see ann_numpy)
+#               scaler.npz    (MinMaxScaler min_/scale_)
+# under modelRegistry/<name>/<version>/ with a manifest.json holding the
+# content hashes, the feature schema, the training-data hash and metrics.
+# <name>/current.json points at the version the prediction scripts use.
+#
+#   python model_registry.py list
+#   python model_registry.py import lgb_hybrid|ann_hybrid   (re-read bestModels/)
+#   python model_registry.py promote <from-name> <to-name>
+#   python model_registry.py bench <name> [--repeat 20]
+
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+REGISTRY_DIR = f"{BASE_DIR}/modelRegistry"
+
+FEATURE_SCHEMA_HASH = hashlib.sha256(json.dumps(
+    {"features": FEATURES, "dtypes": {c: np.dtype(d).name for c, d in FEATURE_DTYPES.items()}},
+    sort_keys=True
+).encode("utf-8")).hexdigest()
+
+# Models the prediction scripts used before the registry existed; they are
+# imported automatically the first time they are resolved, and again as a new
+# version whenever one of their files is replaced
+LEGACY_ARTIFACTS = {
+    "lgb_hybrid": {"kind": "lightgbm", "model": f"{BASE_DIR}/bestModels/lgb_optuna_final_model_hybrid.pkl"},
+    "ann_hybrid": {"kind": "ann", "model": f"{BASE_DIR}/bestModels/ann_best_model_optuna_hybrid.h5",
+                   "scaler": f"{BASE_DIR}/bestModels/scaler_hybrid.pkl"},
+}
+
+class MinMaxTransform:
+    # Same arithmetic as sklearn's MinMaxScaler.transform (clip=False), without sklearn
+    def __init__(self, min_, scale_):
+        self.min_ = min_
+        self.scale_ = scale_
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float32 if np.asarray(X).dtype == np.float32 else np.float64)
+        X *= self.scale_
+        X += self.min_
+        return X
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "_-" else "_" for c in name)
+
+def _pointer_path(name):
+    return os.path.join(REGISTRY_DIR, _safe_name(name), "current.json")
+
+def _file_marker(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_sha256(path)}
+
+def _changed(path, marker):
+    # Compare size/mtime first and only hash the file when they differ (a copy or touch)
+    if not marker or not os.path.exists(path):
+        return True
+    stat = os.stat(path)
+    if stat.st_mtime_ns == marker["mtime_ns"] and stat.st_size == marker["size"]:
+        return False
+    return file_sha256(path) != marker["sha256"]
+
+def _register(name, kind, write_files, training_data=None, metrics=None, source=None, source_files=None):
+    # write_files(tmp_dir) writes the artifact files; the version is the hash of their contents
+    staging = os.path.join(REGISTRY_DIR, _safe_name(name), f"staging_{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    write_files(staging)
+
+    hashes = {f: file_sha256(os.path.join(staging, f)) for f in sorted(os.listdir(staging))}
+    version = hashlib.sha256(json.dumps(hashes, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    manifest = {
+        "name": name,
+        "version": version,
+        "kind": kind,
+        "files": hashes,
+        "features": FEATURES,
+        "featureSchema": FEATURE_SCHEMA_HASH,
+        "trainingData": {"path": training_data, "sha256": file_sha256(training_data)}
+                        if training_data and os.path.exists(training_data) else None,
+        "metrics": metrics or {},
+        "source": source,
+        "sourceFiles": {path: _file_marker(path) for path in source_files or ()},
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    version_dir = os.path.join(REGISTRY_DIR, _safe_name(name), version)
+    if os.path.exists(version_dir):
+        # Identical artifact already registered: keep it, but record the source
+        # files it was just rebuilt from so they are not re-imported again
+        if source_files:
+            os.replace(os.path.join(staging, "manifest.json"), os.path.join(version_dir, "manifest.json"))
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, version_dir)
+    set_current(name, version)
+    return manifest
+
+def set_current(name, version):
+    tmp_path = _pointer_path(name) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+    os.replace(tmp_path, _pointer_path(name))
+
+def register_lightgbm(name, model, training_data=None, metrics=None, source=None, source_files=None):
+    # Accepts an LGBMRegressor or a Booster
+    booster = getattr(model, "booster_", model)
+    return _register(name, "lightgbm", lambda d: booster.save_model(os.path.join(d, "model.txt")),
+                     training_data, metrics, source, source_files)
+
+def register_ann(name, h5_path, scaler, training_data=None, metrics=None, source=None, source_files=None):
+    # scaler: a fitted MinMaxScaler (or anything with min_ and scale_)
+    def write_files(directory):
+        export_ann_weights(h5_path, os.path.join(directory, "weights.npz"))
+        np.savez(os.path.join(directory, "scaler.npz"), min_=scaler.min_, scale_=scaler.scale_)
+    return _register(name, "ann", write_files, training_data, metrics, source or h5_path, source_files)
+
+def _legacy_files(name):
+    return [path for key, path in LEGACY_ARTIFACTS[name].items() if key != "kind"]
+
+def import_legacy(name):
+    import joblib
+
+    legacy = LEGACY_ARTIFACTS[name]
+    files = _legacy_files(name)
+    if legacy["kind"] == "lightgbm":
+        return register_lightgbm(name, joblib.load(legacy["model"]), source=legacy["model"], source_files=files)
+    return register_ann(name, legacy["model"], joblib.load(legacy["scaler"]), source=legacy["model"],
+                        source_files=files)
+
+def _read_manifest(name):
+    with open(_pointer_path(name), "r", encoding="utf-8") as f:
+        version = json.load(f)["version"]
+    with open(os.path.join(artifact_dir(name, version), "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def manifest(name):
+    """
+    Manifest of the current version of `name`, importing it from the legacy
+    bestModels/ files on first use and re-importing it when those files were
+    replaced since. A version promoted or trained into `name` is left alone.
+    """
+    if not os.path.exists(_pointer_path(name)):
+        if name not in LEGACY_ARTIFACTS:
+            raise FileNotFoundError(f"No model registered as '{name}'")
+        return import_legacy(name)
+    m = _read_manifest(name)
+    if name in LEGACY_ARTIFACTS and m.get("source") == LEGACY_ARTIFACTS[name]["model"]:
+        markers = m.get("sourceFiles") or {}
+        if any(_changed(path, markers.get(path)) for path in _legacy_files(name)):
+            return import_legacy(name)
+    return m
+
+def artifact_dir(name, version):
+    return os.path.join(REGISTRY_DIR, _safe_name(name), version)
+
+def model_files(name):
+    # Files whose change means a different model: the pointer and the manifest it points at
+    m = manifest(name)
+    return [_pointer_path(name), os.path.join(artifact_dir(name, m["version"]), "manifest.json")]
+
+def load(name, part="model"):
+    """
+    Load the current version of `name`. part="scaler" returns the ANN's input
+    scaler instead of the network.
+    """
+    m = manifest(name)
+    directory = artifact_dir(name, m["version"])
+    if m["kind"] == "lightgbm":
+        import lightgbm as lgb
+        return lgb.Booster(model_file=os.path.join(directory, "model.txt"))
+    if part == "scaler":
+        with np.load(os.path.join(directory, "scaler.npz")) as data:
+            return MinMaxTransform(data["min_"], data["scale_"])
+    return load_numpy_ann(os.path.join(directory, "weights.npz"))
+
+def describe(name):
+    m = manifest(name)
+    return f"{name}@{m['version']}"
+
+def benchmark(name, repeat=20):
+    # Load time of the registry format against the original pickle/.h5 it was imported from
+    def timed(fn):
+        fn()  # warm imports and the OS file cache
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) / repeat * 1000
+
+    m = manifest(name)
+    results = {f"registry ({m['kind']})": timed(lambda: load(name))}
+    source = m.get("source")
+    if source and os.path.exists(source):
+        if source.endswith(".pkl"):
+            import joblib
+            results["joblib pickle"] = timed(lambda: joblib.load(source))
+        elif source.endswith(".h5"):
+            from tensorflow.keras.models import load_model
+            results["keras .h5"] = timed(lambda: load_model(source, compile=False))
+    return results
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "list":
+        names = sorted(os.listdir(REGISTRY_DIR)) if os.path.isdir(REGISTRY_DIR) else []
+        for name in names:
+            if os.path.exists(_pointer_path(name)):
+                m = manifest(name)
+                print(f"📦 {name}@{m['version']} ({m['kind']}, {m['created']}) metrics={m['metrics']}")
+
+    elif command == "import":
+        for name in sys.argv[2:] or sorted(LEGACY_ARTIFACTS):
+            print(f"✅ Imported {name}@{import_legacy(name)['version']}")
+
+    elif command == "promote":
+        # e.g. promote "lgb_EL PASO" lgb_hybrid: serve a trained city model to the prediction scripts
+        source_name, target_name = sys.argv[2], sys.argv[3]
+        m = manifest(source_name)
+        os.makedirs(os.path.join(REGISTRY_DIR, _safe_name(target_name)), exist_ok=True)
+        shutil.copytree(artifact_dir(source_name, m["version"]), artifact_dir(target_name, m["version"]),
+                        dirs_exist_ok=True)
+        set_current(target_name, m["version"])
+        print(f"✅ {target_name} now serves {source_name}@{m['version']}")
+
+    elif command == "bench":
+        name = sys.argv[2]
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 20
+        for label, ms in benchmark(name, repeat).items():
+            print(f"⏱️ {name} {label}: {ms:.1f} ms per load")
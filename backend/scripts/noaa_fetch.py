@@ -0,0 +1,332 @@
+import sys
+import os
+import json
+import time
+import random
+import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Download stage for the NOAA ISD global-hourly station-year files.
+#
+# Files live in a persistent raw cache, one per station-year:
+#   <cache_dir>/<usaf><wban>/<year>.csv        the file as served by NOAA
+#   <cache_dir>/<usaf><wban>/<year>.csv.json   ETag / Last-Modified / fetch time
+# A year that was fetched after it ended (plus CLOSED_AFTER for late QC
+# corrections) is closed and never requested again. Any other cached year is
+# revalidated with If-None-Match / If-Modified-Since, so an unchanged file costs
+# a 304. An interrupted download keeps its .part file and resumes with a Range
+# request guarded by If-Range.
+#
+# All years of a station are fetched concurrently by a bounded thread pool
+# sharing one pooled requests.Session. Bodies are streamed in 1 MB chunks.
+# Failed attempts are retried with capped exponential backoff and full jitter;
+# a 404 (year not published) is not retried.
+#
+#   python noaa_fetch.py --selftest   (against a local HTTP stand-in)
+
+BASE_URL = "https://www.ncei.noaa.gov/data/global-hourly/access/{year}/{usaf}{wban}.csv"
+
+DEFAULT_WORKERS = 6
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = (10, 60)  # connect, read (seconds between bytes)
+
+# Worst case per file: RETRIES attempts, each waiting at most BACKOFF_CAP seconds
+RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# A year fetched this long after it ended is not expected to change any more
+CLOSED_AFTER = datetime.timedelta(days=30)
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    # One connection pool for every worker, so connections to the host are reused
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def backoff_delay(attempt, base=None, cap=None):
+    # "Full jitter": uniform in [0, min(cap, base * 2^attempt)]
+    base = BACKOFF_BASE if base is None else base
+    cap = BACKOFF_CAP if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def cache_path(cache_dir, usaf, wban, year):
+    return os.path.join(cache_dir, f"{usaf}{wban}", f"{year}.csv")
+
+def read_meta(path):
+    try:
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_meta(path, meta):
+    tmp_path = path + ".json.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, path + ".json")
+
+def remove_meta(path):
+    if os.path.exists(path + ".json"):
+        os.remove(path + ".json")
+
+def is_closed(year, meta):
+    # Closed once a copy was fetched well after the year ended
+    fetched = meta.get("fetched")
+    return bool(fetched) and datetime.datetime.fromisoformat(fetched) >= datetime.datetime(year + 1, 1, 1) + CLOSED_AFTER
+
+def validators(response):
+    return {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+def download_file(session, url, save_path, retries=RETRIES, timeout=TIMEOUT, chunk_size=CHUNK_SIZE):
+    """
+    Bring `save_path` up to date with `url`: a conditional GET when a cached
+    copy exists, a Range resume when a .part file was left behind. Returns a
+    result dict (ok, status, bytes on disk, transferred, seconds, attempts)
+    instead of raising, so one bad year never stops the others.
+    """
+    result = {"url": url, "path": save_path, "ok": False, "status": None, "bytes": 0, "transferred": 0,
+              "seconds": 0.0, "attempts": 0, "cached": False}
+    part_path = save_path + ".part"
+    meta = read_meta(save_path) if os.path.exists(save_path) else {}
+    started = time.perf_counter()
+
+    for attempt in range(retries):
+        result["attempts"] = attempt + 1
+        headers = {}
+        part_meta = read_meta(part_path) if os.path.exists(part_path) else {}
+        offset = os.path.getsize(part_path) if part_meta else 0
+        if offset and (part_meta.get("etag") or part_meta.get("last_modified")):
+            # Resume the interrupted body, but only if it is still the same version
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = part_meta.get("etag") or part_meta.get("last_modified")
+        else:
+            offset = 0
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                result["status"] = response.status_code
+                if response.status_code == 304:
+                    # Unchanged since the cached copy
+                    write_meta(save_path, dict(meta, fetched=datetime.datetime.now().isoformat(timespec="seconds")))
+                    result.update(ok=True, cached=True, bytes=os.path.getsize(save_path),
+                                  seconds=time.perf_counter() - started)
+                    return result
+                if response.status_code == 416:
+                    # The .part is not a prefix of the current file any more: start over
+                    os.remove(part_path)
+                    remove_meta(part_path)
+                    continue
+                if response.status_code in (200, 206):
+                    resumed = response.status_code == 206
+                    if not resumed:
+                        write_meta(part_path, validators(response))
+                    with open(part_path, "ab" if resumed else "wb") as file:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            file.write(chunk)
+                            result["transferred"] += len(chunk)
+                    version = read_meta(part_path)
+                    os.replace(part_path, save_path)
+                    remove_meta(part_path)
+                    write_meta(save_path, dict(version, fetched=datetime.datetime.now().isoformat(timespec="seconds")))
+                    result.update(ok=True, bytes=os.path.getsize(save_path), seconds=time.perf_counter() - started)
+                    return result
+                if response.status_code not in RETRY_STATUS:
+                    print(f"❌ Failed: {url} (Status: {response.status_code})")
+                    break
+                print(f"⏳ {url} returned {response.status_code} (Attempt {attempt + 1}/{retries})")
+        except requests.exceptions.Timeout:
+            print(f"⏳ Timeout: {url} (Attempt {attempt + 1}/{retries})")
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error downloading {url}: {e} (Attempt {attempt + 1}/{retries})")
+
+        if attempt < retries - 1:
+            time.sleep(backoff_delay(attempt))
+
+    # The .part (and its version) stay for a Range resume on the next run
+    result["seconds"] = time.perf_counter() - started
+    if result["status"] in RETRY_STATUS or result["status"] is None:
+        print(f"🚫 Skipped: {url} after {result['attempts']} attempts")
+    if os.path.exists(save_path):
+        # A stale copy is still better than no year at all
+        result.update(ok=True, cached=True, bytes=os.path.getsize(save_path))
+        print(f"⚠️ Using the cached copy of {save_path}")
+    return result
+
+def throughput_line(result):
+    mb = result["transferred"] / 1e6
+    rate = mb / result["seconds"] if result["seconds"] > 0 else float("inf")
+    return f"{result['year']}: {mb:.2f} MB in {result['seconds']:.2f}s ({rate:.2f} MB/s)"
+
+def download_station(usaf, wban, years, cache_dir, workers=DEFAULT_WORKERS, base_url=BASE_URL, session=None,
+                     on_ready=None):
+    """
+    Bring every year of one station up to date in the raw cache, concurrently.
+    Closed years are not requested. on_ready(path), when given, runs in the
+    worker as soon as a year's file is ready (e.g. to parse it while other
+    years are still downloading); its return value is stored as result["data"].
+    Returns the per-file results in year order.
+    """
+    os.makedirs(os.path.join(cache_dir, f"{usaf}{wban}"), exist_ok=True)
+    session = session or make_session(workers)
+
+    results, jobs = {}, []
+    for year in years:
+        path = cache_path(cache_dir, usaf, wban, year)
+        if os.path.exists(path) and is_closed(year, read_meta(path)):
+            results[year] = {"url": None, "path": path, "ok": True, "status": "closed", "bytes": os.path.getsize(path),
+                             "transferred": 0, "seconds": 0.0, "attempts": 0, "cached": True}
+        else:
+            jobs.append((year, base_url.format(year=year, usaf=usaf, wban=wban), path))
+
+    def process(year, url=None, path=None):
+        result = results[year] if url is None else download_file(session, url, path)
+        if on_ready is not None and result["ok"]:
+            result["data"] = on_ready(result["path"])
+        return year, result
+
+    started = time.perf_counter()
+    tasks = jobs + ([(year,) for year in results] if on_ready is not None else [])
+    if tasks:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as pool:
+            for year, result in pool.map(lambda task: process(*task), tasks):
+                results[year] = result
+    seconds = time.perf_counter() - started
+
+    ordered = []
+    for year in years:
+        result = dict(results[year], year=year)
+        if result["status"] == "closed":
+            print(f"🔒 {usaf}-{wban} {year}: closed year, cached")
+        elif result["status"] == 304:
+            print(f"🔁 {usaf}-{wban} {year}: not modified")
+        elif result["ok"] and result["transferred"]:
+            print(f"✅ Downloaded {usaf}-{wban} {throughput_line(result)}")
+        ordered.append(result)
+    transferred_mb = sum(r["transferred"] for r in ordered) / 1e6
+    cached_mb = sum(r["bytes"] for r in ordered if r["cached"]) / 1e6
+    print(f"📥 {usaf}-{wban}: {sum(r['ok'] for r in ordered)}/{len(ordered)} years, "
+          f"{transferred_mb:.2f} MB transferred in {seconds:.2f}s, {cached_mb:.2f} MB from cache")
+    return ordered
+
+def _selftest():
+    # A local stand-in for the NOAA server with ETag/If-None-Match, Last-Modified
+    # and Range support. One year fails twice with 503 and one year is missing (404).
+    import tempfile
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    global BACKOFF_BASE
+    BACKOFF_BASE = 0.05  # keep the retries fast
+    root = tempfile.mkdtemp()
+    this_year = datetime.date.today().year
+    years = [2015, 2016, 2017, this_year - 1, this_year]
+    published = years[:3] + [this_year]  # last year is missing on purpose
+
+    def fixture(year, rows=50000):
+        path = os.path.join(root, str(year), "72270023044.csv")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("DATE,TMP\n" + f"{year}-01-01T00:00:00,+0150,1\n" * rows)
+        return path
+
+    for year in published:
+        fixture(year)
+    failures = {"/2016/72270023044.csv": 2}
+    served = []
+
+    class StandIn(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = os.path.join(root, self.path.lstrip("/"))
+            if failures.get(self.path, 0) > 0:
+                failures[self.path] -= 1
+                return self.send_error(503)
+            if not os.path.exists(path):
+                return self.send_error(404)
+            with open(path, "rb") as f:
+                body = f.read()
+            stat = os.stat(path)
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            start = 0
+            if self.headers.get("Range") and self.headers.get("If-Range") == etag:
+                start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            else:
+                self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body) - start))
+            self.end_headers()
+            self.wfile.write(body[start:])
+            served.append(len(body) - start)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}" + "/{year}/{usaf}{wban}.csv"
+    cache_dir = os.path.join(root, "cache")
+    fetch = lambda: {r["year"]: r for r in download_station("722700", "23044", years, cache_dir,
+                                                              workers=4, base_url=base_url)}
+
+    # 1. Cold cache: everything published is downloaded, 2016 after two retries
+    by_year = fetch()
+    assert all(by_year[y]["ok"] for y in published), by_year
+    assert by_year[2016]["attempts"] == 3, by_year[2016]
+    assert not by_year[this_year - 1]["ok"] and by_year[this_year - 1]["status"] == 404
+    for year in published:
+        with open(os.path.join(root, str(year), "72270023044.csv"), "rb") as a, open(by_year[year]["path"], "rb") as b:
+            assert a.read() == b.read()
+
+    # 2. Warm cache: past years are closed (no request), the current year is a 304
+    served.clear()
+    by_year = fetch()
+    assert all(by_year[y]["status"] == "closed" for y in years[:3]), by_year
+    assert by_year[this_year]["status"] == 304 and sum(served) == 0
+    sizes = download_station("722700", "23044", years, cache_dir, base_url=base_url, on_ready=os.path.getsize)
+    assert all(r["data"] == r["bytes"] for r in sizes if r["ok"])
+
+    # 3. The current year grows: it is fetched again, nothing else is
+    time.sleep(0.01)
+    fixture(this_year, rows=50100)
+    by_year = fetch()
+    assert by_year[this_year]["status"] == 200 and sum(served) == os.path.getsize(by_year[this_year]["path"])
+
+    # 4. An interrupted download resumes from its .part with a Range request
+    path = by_year[this_year]["path"]
+    with open(path, "rb") as f:
+        body = f.read()
+    etag = read_meta(path)["etag"]
+    os.remove(path)
+    remove_meta(path)
+    with open(path + ".part", "wb") as f:
+        f.write(body[:1000])
+    write_meta(path + ".part", {"etag": etag, "last_modified": None})
+    served.clear()
+    by_year = fetch()
+    assert by_year[this_year]["status"] == 206 and served == [len(body) - 1000]
+    with open(path, "rb") as f:
+        assert f.read() == body
+    server.shutdown()
+
+    assert not any(name.endswith(".part") for name in os.listdir(os.path.dirname(path)))
+    print("✅ noaa_fetch behaves as expected against the local HTTP stand-in")
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        _selftest()
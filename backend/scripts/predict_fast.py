@@ -1,11 +1,15 @@
 import pandas as pd
+from dataset_cache import read_dataset
 import numpy as np
-import joblib
 import lightgbm as lgb
 import sys
 import os
 import json
-from pymongo import MongoClient
+import summary_store
+import model_registry
+from forecast_cache import forecast_key, cache_path, load_forecast, store_forecast, slice_by_date
+from forecast_engine import recursive_forecast, forecast_window
+from feature_schema import FEATURES
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -16,121 +20,177 @@ def iterative_forecast_with_bridge(
     features,
     time_col="DATE",
     demand_col="Demand (MW)",
-    lag_hours=24
+    lag_hours=24,
+    block_size=None,
+    start_date=None,
+    end_date=None
 ):
-    train_df = pd.read_csv(train_csv, parse_dates=[time_col])
+    train_df = read_dataset(train_csv)
     train_df.sort_values(time_col, inplace=True, ignore_index=True)
     bridging_df = train_df.tail(lag_hours).copy()
 
-    future_df = pd.read_csv(future_csv, parse_dates=[time_col])
+    future_df = read_dataset(future_csv)
     future_df.sort_values(time_col, inplace=True, ignore_index=True)
 
-    history_df = bridging_df.copy()
-    predictions_list = []
-
-    for i in range(len(future_df)):
-        future_row = future_df.iloc[[i]].copy()
-        if demand_col not in future_row.columns:
-            future_row[demand_col] = np.nan
-
-        combined = pd.concat([history_df.tail(lag_hours), future_row], ignore_index=True)
-        combined["Demand_lag24"] = combined[demand_col].shift(lag_hours)
-        combined["Demand_roll24"] = combined[demand_col].rolling(window=lag_hours, min_periods=1).mean()
-
-        row_to_predict = combined.iloc[[-1]].copy()
-        X = row_to_predict[features]
-        y_pred = model.predict(X)[0]
-
-        combined.at[combined.index[-1], demand_col] = y_pred
-        predicted_row = combined.iloc[[-1]].copy()
-        predicted_row["Predicted Demand"] = y_pred
-        predictions_list.append(predicted_row)
-        history_df = pd.concat([history_df, predicted_row], ignore_index=True)
-
-    pred_df = pd.concat(predictions_list, ignore_index=True)
-    pred_df.sort_values(time_col, inplace=True)
-    pred_df.reset_index(drop=True, inplace=True)
-    return pred_df
-
-def filter_csv_by_date(input_file, output_file, start_date, end_date):
-    df = pd.read_csv(input_file)
-    df['DATE'] = pd.to_datetime(df['DATE'])
-    filtered_df = df[(df['DATE'] >= start_date) & (df['DATE'] <= end_date)]
+    # Only forecast what the requested window depends on
+    if start_date is not None or end_date is not None:
+        return forecast_window(
+            model=model,
+            bridge_df=bridging_df,
+            future_df=future_df,
+            features=features,
+            start_date=start_date if start_date is not None else future_df[time_col].min(),
+            end_date=end_date if end_date is not None else future_df[time_col].max(),
+            time_col=time_col,
+            demand_col=demand_col,
+            lag_hours=lag_hours,
+            block_size=block_size
+        )
+
+    return recursive_forecast(
+        model=model,
+        bridge_df=bridging_df,
+        future_df=future_df,
+        features=features,
+        time_col=time_col,
+        demand_col=demand_col,
+        lag_hours=lag_hours,
+        block_size=block_size
+    )
+
+def filter_df_by_date(df, output_file, start_date, end_date):
+    filtered_df = slice_by_date(df, start_date, end_date)
     filtered_df.to_csv(output_file, index=False)
     print(f"✅ Filtered data saved to {output_file}")
+    return filtered_df
 
-if __name__ == "__main__":
-    # 1. Get command line args
-    city_name = sys.argv[1]
-    start_date = sys.argv[2]
-    end_date = sys.argv[3]
-
-    # 2. Set paths
-    train_path = f"D:/FYPs/ffyypp/ffyypp/backend/trainingData/{city_name}_TrainingData.csv"
-    test_path = f"D:/FYPs/ffyypp/ffyypp/backend/testData/{city_name}_TestData.csv"
-    model_path = f"D:/FYPs/ffyypp/ffyypp/backend/bestModels/lgb_optuna_final_model_hybrid.pkl"
-    prediction_output_path = f"D:/FYPs/ffyypp/ffyypp/backend/predictionResult/{city_name}_accurate_result.csv"
-    specific_output_path = f"D:/FYPs/ffyypp/ffyypp/backend/Result/SpecificResult.csv"
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+CACHE_DIR = f"{BASE_DIR}/forecastCache"
 
-    # 3. Load model
-    model = joblib.load(model_path)
+def get_paths(city_name):
+    return {
+        "train": f"{BASE_DIR}/trainingData/{city_name}_TrainingData.csv",
+        "test": f"{BASE_DIR}/testData/{city_name}_TestData.csv",
+        "prediction_output": f"{BASE_DIR}/predictionResult/{city_name}_accurate_result.csv",
+        "specific_output": f"{BASE_DIR}/Result/SpecificResult.csv",
+    }
 
-    # 4. Define features
-    features = [
-        "Season", "TMP", "HUMIDITY", "Hour Number", "Weekday", "Month",
-        "Public Holiday", "Wind Speed", "Rainfall/Snowfall"
-    ]
+# Registry entry served to every city (see model_registry.py promote)
+MODEL_NAME = "lgb_hybrid"
+
+def model_files(city_name):
+    # Files whose change on disk means the loaded models are stale
+    return model_registry.model_files(MODEL_NAME)
+
+def load_models(city_name):
+    # Native LightGBM text model from the registry (no pickle / sklearn wrapper)
+    version = model_registry.describe(MODEL_NAME)
+    print(f"🏷️ Using model {version}")
+    return {"model": model_registry.load(MODEL_NAME), "versions": {"lgb": version}}
+
+def cache_key(city_name):
+    # Full-horizon forecasts are reused while the model and data are unchanged
+    paths = get_paths(city_name)
+    return forecast_key(
+        city_name, "fast",
+        model_files=model_files(city_name),
+        data_files=[paths["train"], paths["test"]],
+        params={"features": FEATURES, "lag_hours": 24}
+    )
 
-    # 5. Run forecast
+def full_forecast(city_name, models, key):
+    # Whole test horizon: fills the forecast cache and the result CSV the dashboards read
+    paths = get_paths(city_name)
     result_df = iterative_forecast_with_bridge(
-        model=model,
-        train_csv=train_path,
-        future_csv=test_path,
-        features=features,
+        model=models["model"],
+        train_csv=paths["train"],
+        future_csv=paths["test"],
+        features=FEATURES,
         time_col="DATE",
         demand_col="Demand (MW)",
         lag_hours=24
     )
-
-    # 6. Save full prediction
-    result_df.to_csv(prediction_output_path, index=False)
-
-    # 7. Filter based on date range and save
+    store_forecast(CACHE_DIR, city_name, "fast", key, result_df)
+    result_df.to_csv(paths["prediction_output"], index=False)
+    return result_df
+
+def fill_cache(city_name, models):
+    # Run by forecast_worker after a request has been answered, so only
+    # full-horizon requests ever wait for the full horizon
+    key = cache_key(city_name)
+    if not os.path.exists(cache_path(CACHE_DIR, city_name, "fast", key)):
+        full_forecast(city_name, models, key)
+
+def covers_horizon(csv_path, start_date_time, end_date_time):
+    dates = read_dataset(csv_path)["DATE"]
+    return pd.Timestamp(start_date_time) <= dates.min() and dates.max() <= pd.Timestamp(end_date_time)
+
+def run_prediction(city_name, start_date, end_date, models):
+    paths = get_paths(city_name)
     start_date_time = f"{start_date} 00:00:00"
     end_date_time = f"{end_date} 23:59:59"
-    filter_csv_by_date(prediction_output_path, specific_output_path, start_date_time, end_date_time)
 
-    # 8. Print summary
+    # 1. Reuse the cached full-horizon forecast when model and data are unchanged
+    key = cache_key(city_name)
+    result_df = load_forecast(CACHE_DIR, city_name, "fast", key)
+    if result_df is None and covers_horizon(paths["test"], start_date_time, end_date_time):
+        # The request is the whole horizon anyway: forecast it once and cache it
+        result_df = full_forecast(city_name, models, key)
+    elif result_df is not None and not os.path.exists(paths["prediction_output"]):
+        result_df.to_csv(paths["prediction_output"], index=False)
+
+    if result_df is not None:
+        # 2. Slice the requested range out of the full forecast
+        specific_df = filter_df_by_date(result_df, paths["specific_output"], start_date_time, end_date_time)
+    else:
+        # 2. Cache miss: forecast only the lag bridge and the requested window
+        specific_df = iterative_forecast_with_bridge(
+            model=models["model"],
+            train_csv=paths["train"],
+            future_csv=paths["test"],
+            features=FEATURES,
+            time_col="DATE",
+            demand_col="Demand (MW)",
+            lag_hours=24,
+            start_date=start_date_time,
+            end_date=end_date_time
+        )
+        specific_df.to_csv(paths["specific_output"], index=False)
+        print(f"✅ Filtered data saved to {paths['specific_output']}")
+    if specific_df.empty:
+        raise ValueError(f"No test data for {city_name} between {start_date} and {end_date}")
+
+    # 3. Build summary for the requested range
     summary = {
-        "expectedUsage": round(result_df["Predicted Demand"].mean(), 2),
-        "percentChange": round((result_df["Predicted Demand"].pct_change().mean()) * 100, 2),
+        "expectedUsage": round(specific_df["Predicted Demand"].mean(), 2),
+        "percentChange": round((specific_df["Predicted Demand"].pct_change().mean()) * 100, 2),
         "confidence": 93,
-        "peakDay": str(result_df.loc[result_df["Predicted Demand"].idxmax()]["DATE"].date()),
-        "peakHour": "18:00-19:00"
+        "peakDay": str(specific_df.loc[specific_df["Predicted Demand"].idxmax()]["DATE"].date()),
+        "peakHour": "18:00-19:00",
+        "modelVersion": models.get("versions")
     }
+    return summary
+
+def store_summary(city_name, summary):
+    # Save prediction summary to MongoDB (model_specs), one document per city and model type
+    try:
+        summary_store.store_summary(city_name, "fast", summary)
+        print("✅ Prediction summary stored in MongoDB.")
+    except Exception as e:
+        print(f"❌ Failed to store summary in MongoDB: {e}")
+
+if __name__ == "__main__":
+    # 1. Get command line args
+    city_name = sys.argv[1]
+    start_date = sys.argv[2]
+    end_date = sys.argv[3]
+
+    # 2. Load model
+    models = load_models(city_name)
 
+    # 3. Run forecast and print summary
+    summary = run_prediction(city_name, start_date, end_date, models)
     print(json.dumps(summary))
-# 9. Save prediction summary to MongoDB (model_specs)
-try:
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["wattwiseai"]
-    model_specs_collection = db["model_specs"]
-
-    # Remove previous entry for this city
-    model_specs_collection.delete_many({ "city": city_name })
-
-    # Add new summary
-    model_specs_collection.insert_one({
-        "city": city_name,
-        "modelType": "fast",  # or "hybrid" depending on script
-        "expectedUsage": summary["expectedUsage"],
-        "percentChange": summary["percentChange"],
-        "confidence": summary["confidence"],
-        "peakDay": summary["peakDay"],
-        "peakHour": summary["peakHour"],
-        "timestamp": pd.Timestamp.now()
-    })
-
-    print("✅ Prediction summary stored in MongoDB.")
-except Exception as e:
-    print(f"❌ Failed to store summary in MongoDB: {e}")
\ No newline at end of file
+
+    # 4. Save prediction summary to MongoDB (model_specs)
+    store_summary(city_name, summary)
\ No newline at end of file
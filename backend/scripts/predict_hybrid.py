@@ -1,68 +1,134 @@
 import pandas as pd
+from dataset_cache import read_dataset
 import numpy as np
-import joblib
-import lightgbm as lgb
-from tensorflow.keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
 import sys
 import os
-from pymongo import MongoClient
+import summary_store
+from forecast_cache import forecast_key, cache_path, load_forecast, store_forecast, slice_by_date
+import model_registry
+from feature_schema import FEATURES, feature_matrix
+from ensemble import run_members, weighted_ensemble
 import json
 sys.stdout.reconfigure(encoding='utf-8')
 
-def filter_csv_by_date(input_file, output_file, start_date, end_date):
-    df = pd.read_csv(input_file)
-    df['DATE'] = pd.to_datetime(df['DATE'])
-    filtered_df = df[(df['DATE'] >= start_date) & (df['DATE'] <= end_date)]
+def filter_df_by_date(df, output_file, start_date, end_date):
+    filtered_df = slice_by_date(df, start_date, end_date)
     filtered_df.to_csv(output_file, index=False)
     print(f"✅ Filtered data saved to {output_file}")
+    return filtered_df
 
-if __name__ == "__main__":
-    # 1. Get command-line arguments
-    city = sys.argv[1]
-    start_date = sys.argv[2]
-    end_date = sys.argv[3]
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+CACHE_DIR = f"{BASE_DIR}/forecastCache"
+
+# Ensemble members and their weights (normalised to sum to 1)
+ENSEMBLE_WEIGHTS = {"ann": 0.6, "lgb": 0.4}
+
+# Both members run at the same time, so split the cores between them
+ANN_BATCH_SIZE = int(os.environ.get("WATTWISE_ANN_BATCH_SIZE", "8192"))
+LGB_NUM_THREADS = int(os.environ.get("WATTWISE_LGB_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+def get_paths(city):
+    return {
+        "test": f"{BASE_DIR}/testData/{city}_TestData.csv",
+        "prediction_output": f"{BASE_DIR}/predictionResult/{city}_hybrid_result.csv",
+        "specific_output": f"{BASE_DIR}/Result/SpecificResult.csv",
+    }
+
+# Registry entries served to every city (see model_registry.py promote)
+MODEL_NAMES = {"ann": "ann_hybrid", "lgb": "lgb_hybrid"}
+
+def model_files(city):
+    # Files whose change on disk means the loaded models are stale
+    return [path for name in MODEL_NAMES.values() for path in model_registry.model_files(name)]
+
+def load_models(city):
+    # Folded NumPy ANN + scaler arrays and the native LightGBM text model from the registry
+    versions = {member: model_registry.describe(name) for member, name in MODEL_NAMES.items()}
+    for version in versions.values():
+        print(f"🏷️ Using model {version}")
+    return {
+        "ann_model": model_registry.load(MODEL_NAMES["ann"]),
+        "lgb_model": model_registry.load(MODEL_NAMES["lgb"]),
+        "scaler": model_registry.load(MODEL_NAMES["ann"], part="scaler"),
+        "versions": versions,
+    }
+
+def ensemble_members(models):
+    # name -> predict(X) on the raw float32 feature matrix
+    return {
+        "ann": lambda X: models["ann_model"].predict(
+            models["scaler"].transform(X), batch_size=ANN_BATCH_SIZE, verbose=0
+        ),
+        "lgb": lambda X: models["lgb_model"].predict(X, num_threads=LGB_NUM_THREADS),
+    }
 
-    # 2. Set Paths
-    test_path = f"D:/FYPs/ffyypp/ffyypp/backend/testData/{city}_TestData.csv"
-    ann_model_path = f"D:/FYPs/ffyypp/ffyypp/backend/bestModels/ann_best_model_optuna_hybrid.h5"
-    lgb_model_path = f"D:/FYPs/ffyypp/ffyypp/backend/bestModels/lgb_optuna_final_model_hybrid.pkl"
-    scaler_path = f"D:/FYPs/ffyypp/ffyypp/backend/bestModels/scaler_hybrid.pkl"
-    prediction_output_path = f"D:/FYPs/ffyypp/ffyypp/backend/predictionResult/{city}_hybrid_result.csv"
-    specific_output_path = f"D:/FYPs/ffyypp/ffyypp/backend/Result/SpecificResult.csv"
-
-    # 3. Load Models and Scaler
-    ann_model = load_model(ann_model_path)
-    lgb_model = joblib.load(lgb_model_path)
-    scaler = joblib.load(scaler_path)
-
-    # 4. Load Test Data
-    test_df = pd.read_csv(test_path, parse_dates=['DATE'])
-    features = ['Season', 'TMP', 'HUMIDITY', 'Hour Number', 'Weekday', 'Month',
-                'Public Holiday', 'Wind Speed', 'Rainfall/Snowfall']
-    X = test_df[features]
-
-    # 5. Predict
-    X_ann_scaled = scaler.transform(X)
-    pred_ann = ann_model.predict(X_ann_scaled).flatten()
-    pred_lgb = lgb_model.predict(X)
-
-    # 6. Ensemble (Weighted Average)
-    alpha = 0.6
-    final_preds = alpha * pred_ann + (1 - alpha) * pred_lgb
-
-    # 7. Append predictions to DataFrame and Save Full Result
+def predict_rows(test_df, models):
+    # One contiguous float32 matrix feeds the scaler, the ANN and LightGBM
+    X = feature_matrix(test_df, FEATURES)
+
+    # Predict (all members concurrently)
+    results = run_members(ensemble_members(models), X)
+    for name, (_, seconds) in results.items():
+        print(f"⏱️ {name} predicted {len(X)} rows in {seconds * 1000:.1f} ms")
+
+    # Ensemble (Weighted Average)
+    final_preds = weighted_ensemble({name: preds for name, (preds, _) in results.items()}, ENSEMBLE_WEIGHTS)
     test_df['Ensemble_Predicted_Demand'] = final_preds
-    test_df.to_csv(prediction_output_path, index=False)
+    return test_df
+
+def cache_key(city):
+    # Full-horizon forecasts are reused while the models and data are unchanged
+    return forecast_key(
+        city, "hybrid",
+        model_files=model_files(city),
+        data_files=[get_paths(city)["test"]],
+        params={"features": FEATURES, "weights": ENSEMBLE_WEIGHTS}
+    )
+
+def full_forecast(city, models, key, test_df=None):
+    # Whole test horizon: fills the forecast cache and the result CSV the dashboards read
+    paths = get_paths(city)
+    test_df = predict_rows(read_dataset(paths["test"]) if test_df is None else test_df, models)
+    store_forecast(CACHE_DIR, city, "hybrid", key, test_df)
+    test_df.to_csv(paths["prediction_output"], index=False)
+    return test_df
 
-    # 8. Filter date range
+def fill_cache(city, models):
+    # Run by forecast_worker after a request has been answered, so only
+    # full-horizon requests ever wait for the full horizon
+    key = cache_key(city)
+    if not os.path.exists(cache_path(CACHE_DIR, city, "hybrid", key)):
+        full_forecast(city, models, key)
+
+def run_prediction(city, start_date, end_date, models):
+    paths = get_paths(city)
     start_date_time = f"{start_date} 00:00:00"
     end_date_time = f"{end_date} 23:59:59"
-    filter_csv_by_date(prediction_output_path, specific_output_path, start_date_time, end_date_time)
 
-    specific_df = pd.read_csv(specific_output_path)
-    # 9. Summary JSON
-    specific_df['DATE'] = pd.to_datetime(specific_df['DATE'])  # <-- Add this line
+    # 1. Reuse the cached full-horizon forecast when models and data are unchanged
+    key = cache_key(city)
+    result_df = load_forecast(CACHE_DIR, city, "hybrid", key)
+
+    if result_df is not None:
+        if not os.path.exists(paths["prediction_output"]):
+            result_df.to_csv(paths["prediction_output"], index=False)
+        # 2. Filter date range
+        specific_df = filter_df_by_date(result_df, paths["specific_output"], start_date_time, end_date_time)
+    else:
+        # 2. Cache miss: filter the test rows first and only run the members on the requested range
+        test_df = read_dataset(paths["test"])
+        specific_df = slice_by_date(test_df, start_date_time, end_date_time).reset_index(drop=True)
+        if len(specific_df) == len(test_df):
+            # The request is the whole horizon anyway: cache it
+            specific_df = full_forecast(city, models, key, specific_df)
+        elif not specific_df.empty:
+            specific_df = predict_rows(specific_df, models)
+        specific_df.to_csv(paths["specific_output"], index=False)
+        print(f"✅ Filtered data saved to {paths['specific_output']}")
+    if specific_df.empty:
+        raise ValueError(f"No test data for {city} between {start_date} and {end_date}")
+
+    # 3. Summary JSON
     # Dynamically calculate peak hour range
     peak_hour_num = int(specific_df.loc[specific_df['Ensemble_Predicted_Demand'].idxmax()]['Hour Number'])
     peak_hour_range = f"{peak_hour_num:02d}:00-{(peak_hour_num+1)%24:02d}:00"
@@ -71,32 +137,31 @@ if __name__ == "__main__":
         "percentChange": round((specific_df['Ensemble_Predicted_Demand'].pct_change().mean()) * 100, 2),
         "confidence": 91,
         "peakDay": specific_df.loc[specific_df['Ensemble_Predicted_Demand'].idxmax()]['DATE'].strftime('%B %d, %Y'),
-        "peakHour": peak_hour_range
+        "peakHour": peak_hour_range,
+        "modelVersion": models.get("versions")
     }
+    return summary
+
+def store_summary(city, summary):
+    # Save prediction summary to MongoDB (model_specs), one document per city and model type
+    try:
+        summary_store.store_summary(city, "hybrid", summary)
+        print("✅ Prediction summary stored in MongoDB.")
+    except Exception as e:
+        print(f"❌ Failed to store summary in MongoDB: {e}")
+
+if __name__ == "__main__":
+    # 1. Get command-line arguments
+    city = sys.argv[1]
+    start_date = sys.argv[2]
+    end_date = sys.argv[3]
+
+    # 2. Load Models and Scaler
+    models = load_models(city)
 
+    # 3. Predict and print summary
+    summary = run_prediction(city, start_date, end_date, models)
     print(json.dumps(summary))
 
-# 9. Save prediction summary to MongoDB (model_specs)
-try:
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["wattwiseai"]
-    model_specs_collection = db["model_specs"]
-
-    # Remove previous entry for this city
-    model_specs_collection.delete_many({ "city": city })
-
-    # Add new summary
-    model_specs_collection.insert_one({
-        "city": city,
-        "modelType": "fast",  # or "hybrid" depending on script
-        "expectedUsage": summary["expectedUsage"],
-        "percentChange": summary["percentChange"],
-        "confidence": summary["confidence"],
-        "peakDay": summary["peakDay"],
-        "peakHour": summary["peakHour"],
-        "timestamp": pd.Timestamp.now()
-    })
-
-    print("✅ Prediction summary stored in MongoDB.")
-except Exception as e:
-    print(f"❌ Failed to store summary in MongoDB: {e}")
+    # 4. Save prediction summary to MongoDB (model_specs)
+    store_summary(city, summary)
\ No newline at end of file
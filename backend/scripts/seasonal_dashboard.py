@@ -1,5 +1,6 @@
 # seasonal_trends.py
 import pandas as pd
+from dataset_cache import read_dataset
 import numpy as np
 import json
 import sys
@@ -7,9 +8,10 @@ import sys
 city = sys.argv[1]  # Get city name from CLI
 
 # Load and prepare the data
-df = pd.read_csv(f'D:/FYPs/ffyypp/ffyypp/backend/city/EL PASO.csv')
+df = read_dataset(f'D:/FYPs/ffyypp/ffyypp/backend/city/EL PASO.csv')
 df['DATE'] = pd.to_datetime(df['DATE'])
 df.sort_values('DATE', inplace=True)
+df['Demand (MW)'] = df['Demand (MW)'].astype(float)  # average in float64, the cache stores float32
 
 season_mapping = {1: 'Winter', 2: 'Spring', 3: 'Summer', 4: 'Fall'}
 df['SeasonName'] = df['Season'].map(season_mapping)
@@ -0,0 +1,81 @@
+import os
+import datetime
+from pymongo import MongoClient, ReplaceOne, ASCENDING
+
+# Shared writer for the prediction summaries in wattwiseai.model_specs.
+#
+# One MongoClient (and its connection pool) is reused for the whole process,
+# and each summary is a single upsert keyed on (city, modelType), backed by a
+# unique index. Every function takes an optional `collection`, so a mongomock
+# collection can stand in for a real mongod (see backend/tests/test_summary_store.py).
+
+MONGO_URI = os.environ.get("WATTWISE_MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = "wattwiseai"
+COLLECTION_NAME = "model_specs"
+
+SUMMARY_FIELDS = ["expectedUsage", "percentChange", "confidence", "peakDay", "peakHour"]
+# Stored when the summary has them (registry versions of the models behind the forecast)
+OPTIONAL_FIELDS = ["modelVersion"]
+
+_client = None
+_indexed = set()
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    return _client
+
+def ensure_index(collection):
+    # create_index is idempotent, but only pay the round-trip once per collection
+    key = (collection.database.name, collection.name, id(collection.database.client))
+    if key not in _indexed:
+        collection.create_index([("city", ASCENDING), ("modelType", ASCENDING)], unique=True)
+        _indexed.add(key)
+    return collection
+
+def get_collection(collection=None):
+    if collection is None:
+        collection = get_client()[DB_NAME][COLLECTION_NAME]
+    return ensure_index(collection)
+
+def summary_document(city, model_type, summary, timestamp=None):
+    document = {"city": city, "modelType": model_type}
+    for field in SUMMARY_FIELDS:
+        document[field] = summary[field]
+    for field in OPTIONAL_FIELDS:
+        if summary.get(field) is not None:
+            document[field] = summary[field]
+    document["timestamp"] = timestamp or datetime.datetime.now()
+    return document
+
+def store_summary(city, model_type, summary, collection=None):
+    collection = get_collection(collection)
+    return collection.replace_one(
+        {"city": city, "modelType": model_type},
+        summary_document(city, model_type, summary),
+        upsert=True
+    )
+
+def summary_operations(entries, timestamp=None):
+    # One upsert request per (city, model_type, summary), all stamped with the same time
+    timestamp = timestamp or datetime.datetime.now()
+    return [
+        ReplaceOne(
+            {"city": city, "modelType": model_type},
+            summary_document(city, model_type, summary, timestamp),
+            upsert=True
+        )
+        for city, model_type, summary in entries
+    ]
+
+def store_summaries(entries, collection=None):
+    """
+    Bulk upsert for multi-city runs: entries is an iterable of
+    (city, model_type, summary). Returns the BulkWriteResult, or None when
+    there was nothing to write.
+    """
+    operations = summary_operations(entries)
+    if not operations:
+        return None
+    return get_collection(collection).bulk_write(operations, ordered=False)
@@ -1,4 +1,5 @@
 import pandas as pd
+from dataset_cache import read_dataset
 import numpy as np
 import json
 import sys
@@ -6,12 +7,12 @@ import sys
 city = sys.argv[1]  # Get city name from command-line args
 
 # Load files
-predictions_df = pd.read_csv(f'D:/FYPs/ffyypp/ffyypp/backend/predictionResult/EL PASO_hybrid_result.csv')
-actual_df = pd.read_csv(f'D:/FYPs/ffyypp/ffyypp/backend/validationData/EL PASO_ValidationData.csv')
+predictions_df = read_dataset(f'D:/FYPs/ffyypp/ffyypp/backend/predictionResult/EL PASO_hybrid_result.csv')
+actual_df = read_dataset(f'D:/FYPs/ffyypp/ffyypp/backend/validationData/EL PASO_ValidationData.csv')
 
 # Columns
 predictions = predictions_df['Ensemble_Predicted_Demand']
-actual = actual_df['Demand (MW)']
+actual = actual_df['Demand (MW)'].astype(float)
 
 # Tolerance Accuracy Calculation
 tolerances = np.arange(0, 21, 1)
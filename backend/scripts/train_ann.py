@@ -1,33 +1,51 @@
 import sys
-city = sys.argv[1]
-print(f"Training ANN model for city: {city}")
+import os
+import time
+import argparse
 #ANNSIMPLE
 import pandas as pd
+from feature_store import training_features
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout, BatchNormalization
 from tensorflow.keras.callbacks import EarlyStopping
 from sklearn.preprocessing import MinMaxScaler
-import shap
 import joblib
+from ann_numpy import export_ann_weights
+import model_registry
+import training_events as events
+
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+
+# best_params['lr'] was tuned for this batch size; larger batches scale it (see scaled_learning_rate)
+BASE_BATCH_SIZE = 16
 
 # ===========================
 # 1. Data Preparation
 # ===========================
-train_df = pd.read_csv(f'D:/FYPs/ffyypp/ffyypp/backend/trainingData/{city}_TrainingData.csv')
-train_df['DATE'] = pd.to_datetime(train_df['DATE'])
-train_df = train_df.drop(columns=['DATE'])
-
-features = ['Season', 'TMP', 'HUMIDITY', 'Hour Number', 'Weekday', 'Month', 'Public Holiday', 'Wind Speed', 'Rainfall/Snowfall']
-target = 'Demand (MW)'
-
-X = train_df[features].values
-y = train_df[target].values
-
-# Scale features
-scaler = MinMaxScaler()
-X_scaled = scaler.fit_transform(X)
+def load_training_data(city):
+    # Float32 matrix from the feature store, already sorted by DATE: time order matters,
+    # the validation slice is the most recent part of the data
+    features = training_features(city)
+    rows = features.rows()
+    X = np.ascontiguousarray(features.X[rows])
+    y = np.asarray(features.y[rows], dtype=np.float32)
+    return X, y
+
+def time_ordered_split(X, y, val_fraction):
+    # Hold out the last val_fraction of rows (no shuffling across the split)
+    n_val = int(len(X) * val_fraction)
+    if n_val == 0:
+        return (X, y), None
+    return (X[:-n_val], y[:-n_val]), (X[-n_val:], y[-n_val:])
+
+def make_dataset(X, y, batch_size, shuffle=False, seed=42):
+    # Cache the tensors once, reshuffle each epoch, and prepare the next batch while the current one trains
+    ds = tf.data.Dataset.from_tensor_slices((X, y)).cache()
+    if shuffle:
+        ds = ds.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
 
 # ===========================
 # 2. Build and Train Model with Best Parameters
@@ -45,9 +63,18 @@ best_params = {
     'dropout_layer_1': 0.3
 }
 
-def build_best_model(params):
+def scaled_learning_rate(base_lr, batch_size, rule="sqrt"):
+    # "linear" is the usual rule for SGD, "sqrt" behaves better with Adam
+    ratio = batch_size / BASE_BATCH_SIZE
+    if rule == "linear":
+        return base_lr * ratio
+    if rule == "sqrt":
+        return base_lr * np.sqrt(ratio)
+    return base_lr
+
+def build_best_model(params, n_features, lr=None):
     model = Sequential()
-    model.add(Dense(params['units_input'], activation=params['activation'], input_shape=(X_scaled.shape[1],)))
+    model.add(Dense(params['units_input'], activation=params['activation'], input_shape=(n_features,)))
     model.add(BatchNormalization())
     model.add(Dropout(params['dropout_input']))
 
@@ -59,47 +86,132 @@ def build_best_model(params):
     model.add(Dense(1))
 
     # Select optimizer
-    optimizer = tf.keras.optimizers.Adam(learning_rate=params['lr'])
+    optimizer = tf.keras.optimizers.Adam(learning_rate=lr or params['lr'])
 
     model.compile(optimizer=optimizer, loss='mean_squared_error')
     return model
 
-best_model = build_best_model(best_params)
-
-# Define Early Stopping
-early_stopping = EarlyStopping(
-    monitor='loss',      # Monitor training loss
-    patience=10,         # Stop if no improvement after 10 epochs
-    restore_best_weights=True # Restore best weights after stopping
-)
-
-# Train the model with Early Stopping
-best_model.fit(
-    X_scaled, y,
-    epochs=200,
-    batch_size=16,
-    verbose=1,
-    callbacks=[early_stopping]  # Add early stopping
-)
-
-# Save the trained model
-best_model.save(f'D:/FYPs/ffyypp/ffyypp/backend/trainedModels/ann_best_model_optuna_{city}.h5')
-print("Best model has been saved.")
-
-# ===========================
-# 3. Model Interpretability using SHAP
-# ===========================
-background = X_scaled[np.random.choice(X_scaled.shape[0], 100, replace=False)]
-explainer = shap.KernelExplainer(best_model.predict, background)
-
-X_sample = X_scaled[:50]
-shap_values = explainer.shap_values(X_sample)
-
-# Fix indexing issue by converting feature names to a NumPy array
-shap.summary_plot(shap_values, X_sample, feature_names=np.array(features))
-
-# ===========================
-# 4. Save Scaler for Test Data Processing
-# ===========================
-joblib.dump(scaler, f'D:/FYPs/ffyypp/ffyypp/backend/trainedModels/scaler_{city}.pkl')
-print("Scaler has been saved.")
\ No newline at end of file
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    # Prints training samples/sec for every epoch and emits it with the losses as an "epoch" event
+    def __init__(self, n_samples):
+        super().__init__()
+        self.n_samples = n_samples
+        self.epoch_rates = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self.started
+        self.epoch_rates.append(self.n_samples / seconds)
+        print(f"⏱️ Epoch {epoch + 1}: {self.epoch_rates[-1]:,.0f} samples/sec ({seconds:.2f}s)")
+        logs = logs or {}
+        events.emit("epoch", epoch=epoch + 1, loss=logs.get("loss"), val_loss=logs.get("val_loss"),
+                    samples_per_sec=round(self.epoch_rates[-1], 1), seconds=round(seconds, 3))
+
+def configure_threads(intra_op=0, inter_op=0):
+    # Must run before TensorFlow executes its first op; 0 leaves TensorFlow's default
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+def train_model(X_scaled, y, batch_size=256, epochs=200, patience=10, val_fraction=0.1,
+                lr_scaling="sqrt", warmup_epochs=20, verbose=2, metrics=None):
+    (X_tr, y_tr), validation = time_ordered_split(X_scaled, y, val_fraction)
+    lr = scaled_learning_rate(best_params['lr'], batch_size, lr_scaling)
+    print(f"📦 {len(X_tr)} training / {len(validation[0]) if validation else 0} validation rows, "
+          f"batch size {batch_size}, learning rate {lr:.6g}")
+
+    best_model = build_best_model(best_params, X_scaled.shape[1], lr=lr)
+
+    # Define Early Stopping on the held-out (most recent) slice
+    early_stopping = EarlyStopping(
+        monitor='val_loss' if validation else 'loss',
+        patience=patience,         # Stop if no improvement after `patience` epochs
+        start_from_epoch=warmup_epochs,  # the output is still far off the MW scale in the first epochs
+        restore_best_weights=True  # Restore best weights after stopping
+    )
+    throughput = ThroughputLogger(len(X_tr))
+
+    # Train the model with Early Stopping
+    with events.stage("fit", rows=len(X_tr), batch_size=batch_size):
+        best_model.fit(
+            make_dataset(X_tr, y_tr, batch_size, shuffle=True),
+            validation_data=make_dataset(*validation, batch_size) if validation else None,
+            epochs=epochs,
+            shuffle=False,  # the tf.data pipeline already reshuffles every epoch
+            verbose=verbose,
+            callbacks=[early_stopping, throughput]
+        )
+    print(f"⏱️ Mean throughput: {np.mean(throughput.epoch_rates):,.0f} samples/sec "
+          f"over {len(throughput.epoch_rates)} epochs")
+    if metrics is not None:
+        # Filled in for the registry manifest
+        metrics["epochs"] = len(throughput.epoch_rates)
+        metrics["samples_per_sec"] = float(np.mean(throughput.epoch_rates))
+        if validation and early_stopping.best is not None and np.isfinite(early_stopping.best):
+            metrics["val_mse"] = float(early_stopping.best)
+    return best_model
+
+def train_city(city, **train_kwargs):
+    # Full run for one city: train, then save the model, its NumPy export and the scaler
+    with events.stage("load_data"):
+        X, y = load_training_data(city)
+
+    # Scale features
+    with events.stage("scale"):
+        scaler = MinMaxScaler()
+        X_scaled = scaler.fit_transform(X)
+
+    metrics = {"rows": len(y)}
+    best_model = train_model(X_scaled, y, metrics=metrics, **train_kwargs)
+
+    with events.stage("save"):
+        # Save the trained model
+        best_model.save(f'{BASE_DIR}/trainedModels/ann_best_model_optuna_{city}.h5')
+        print("Best model has been saved.")
+
+        # Export folded NumPy weights so prediction does not need TensorFlow
+        export_ann_weights(f'{BASE_DIR}/trainedModels/ann_best_model_optuna_{city}.h5')
+        print("NumPy inference weights have been exported.")
+
+        # ===========================
+        # 3. Save Scaler for Test Data Processing
+        # ===========================
+        joblib.dump(scaler, f'{BASE_DIR}/trainedModels/scaler_{city}.pkl')
+        print("Scaler has been saved.")
+
+        # Folded weights + scaler arrays + manifest for the prediction scripts (promote ann_<city> to serve it)
+        registered = model_registry.register_ann(
+            f"ann_{city}", f'{BASE_DIR}/trainedModels/ann_best_model_optuna_{city}.h5', scaler,
+            training_data=f"{BASE_DIR}/trainingData/{city}_TrainingData.csv", metrics=metrics,
+        )
+    print(f"🏷️ Registered ann_{city}@{registered['version']}")
+
+    # SHAP explanations are a separate job: python explain_model.py <city> --model ann
+    return best_model, scaler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the ANN demand model for a city")
+    parser.add_argument("city")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--patience", type=int, default=10, help="epochs without val_loss improvement before stopping")
+    parser.add_argument("--warmup-epochs", type=int, default=20, help="epochs before early stopping starts watching")
+    parser.add_argument("--val-fraction", type=float, default=0.1, help="most recent share of rows held out for early stopping")
+    parser.add_argument("--lr-scaling", choices=["sqrt", "linear", "none"], default="sqrt",
+                        help=f"how the learning rate grows with batch size (relative to {BASE_BATCH_SIZE})")
+    parser.add_argument("--intra-op-threads", type=int, default=0, help="threads inside one op (0 = TensorFlow default)")
+    parser.add_argument("--inter-op-threads", type=int, default=0, help="ops run in parallel (0 = TensorFlow default)")
+    events.add_arguments(parser)
+    args = parser.parse_args()
+
+    city = args.city
+    events.configure(args.events, args.quiet, script="train_ann", city=city)
+    print(f"Training ANN model for city: {city}")
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+
+    with events.run():
+        train_city(city, batch_size=args.batch_size, epochs=args.epochs,
+                   patience=args.patience, val_fraction=args.val_fraction,
+                   lr_scaling=args.lr_scaling, warmup_epochs=args.warmup_epochs,
+                   verbose=0 if args.quiet else 2)
@@ -0,0 +1,147 @@
+import sys
+import os
+import glob
+import json
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import training_events as events
+from training_events import peak_rss_mb, reset_peak_rss, rss_mb
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Batch trainer for several cities and model types under one CPU budget.
+#
+#   python train_batch.py [--cities "EL PASO" SEATTLE] [--models lgb ann]
+#                         [--cores 8] [--jobs 2] [--incremental]
+#
+# Tasks run on a process pool of --jobs workers. Each worker imports the
+# training modules (and TensorFlow) once and reuses them for every task it
+# gets, and each task is limited to cores // jobs threads. A JSON report with
+# per-task wall time, peak RSS and validation error is written at the end.
+# A worker's peak RSS is reset before each task where the OS allows it (Linux),
+# so peakRssMb is the task's own; rssStartMb is what the worker held before it.
+
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+REPORT_DIR = f"{BASE_DIR}/Result"
+
+MODEL_TYPES = ["lgb", "ann"]
+
+def discover_cities():
+    # Every city with a training file can be trained
+    suffix = "_TrainingData.csv"
+    paths = glob.glob(os.path.join(BASE_DIR, "trainingData", f"*{suffix}"))
+    return sorted(os.path.basename(path)[:-len(suffix)] for path in paths)
+
+def init_worker(threads, model_types):
+    # Import once per worker; TensorFlow's thread pools must be sized before its first op
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import train_lightgbm  # noqa: F401
+    if "ann" in model_types:
+        import train_ann
+        train_ann.configure_threads(threads, 1)
+
+def validation_error(city, predict):
+    # MSE / MAE on the city's validation file, when there is one
+    path = f"{BASE_DIR}/validationData/{city}_ValidationData.csv"
+    if not os.path.exists(path):
+        return None
+    from feature_store import load_features
+
+    features = load_features(path)
+    rows = features.rows()
+    errors = np.asarray(predict(features.X[rows]), dtype=np.float64).ravel() - features.y[rows].astype(np.float64)
+    return {"mse": float(np.mean(errors ** 2)), "mae": float(np.mean(np.abs(errors)))}
+
+def run_task(city, model_type, threads, options):
+    started = time.perf_counter()
+    report = {"city": city, "model": model_type, "threads": threads,
+              "rssStartMb": rss_mb(), "peakRssScope": "task" if reset_peak_rss() else "process"}
+    events.set_context(city=city, model=model_type)  # the training scripts' events name the task
+    try:
+        if model_type == "lgb":
+            import joblib
+            import train_lightgbm
+
+            outcome = None
+            if options.get("incremental"):
+                outcome = train_lightgbm.incremental_update(city, cpus=threads)
+            if outcome in ("updated", "up_to_date"):
+                model = joblib.load(train_lightgbm.model_paths(city)[0])
+            else:
+                model, _ = train_lightgbm.train_city(
+                    city, n_trials=options.get("trials", 30), n_jobs=1, cpus=threads,
+                    fresh=outcome == "drift"
+                )
+            report["mode"] = outcome or "full"
+            report["validation"] = validation_error(city, lambda X: model.booster_.predict(X))
+        else:
+            import train_ann
+
+            model, scaler = train_ann.train_city(city, verbose=0)
+            report["mode"] = "full"
+            report["validation"] = validation_error(city, lambda X: model.predict(scaler.transform(X), verbose=0))
+        report["ok"] = True
+    except Exception as e:
+        report["ok"] = False
+        report["error"] = str(e)
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    report["peakRssMb"] = peak_rss_mb()
+    report["pid"] = os.getpid()
+    return report
+
+def run_batch(cities, model_types, cores=None, jobs=None, options=None):
+    tasks = [(city, model_type) for city in cities for model_type in model_types]
+    cores = max(1, cores or os.cpu_count() or 1)
+    jobs = max(1, min(jobs or cores, cores, len(tasks)))
+    threads = max(1, cores // jobs)
+    print(f"🗂️ {len(tasks)} task(s) on {jobs} worker(s) x {threads} thread(s) ({cores} core budget)")
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(threads, model_types)) as pool:
+        futures = [pool.submit(run_task, city, model_type, threads, options or {})
+                   for city, model_type in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            events.emit("task", **result)
+            status = "✅" if result["ok"] else "❌"
+            print(f"{status} {result['city']} / {result['model']}: {result['seconds']}s, "
+                  f"validation {result.get('validation')}, peak RSS {result['peakRssMb']} MB")
+
+    return {
+        "cores": cores,
+        "jobs": jobs,
+        "threadsPerTask": threads,
+        "wallSeconds": round(time.perf_counter() - started, 2),
+        "tasks": sorted(results, key=lambda r: (r["city"], r["model"])),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train several cities/models under one CPU budget")
+    parser.add_argument("--cities", nargs="+", default=None, help="default: every city with a training file")
+    parser.add_argument("--models", nargs="+", choices=MODEL_TYPES, default=MODEL_TYPES)
+    parser.add_argument("--cores", type=int, default=None, help="total CPU budget (default: all cores)")
+    parser.add_argument("--jobs", type=int, default=None, help="tasks run at the same time")
+    parser.add_argument("--trials", type=int, default=30, help="Optuna trials per LightGBM study")
+    parser.add_argument("--incremental", action="store_true", help="warm-start LightGBM models when possible")
+    parser.add_argument("--report", default=None, help="report path (default: Result/training_report_<time>.json)")
+    events.add_arguments(parser)
+    args = parser.parse_args()
+
+    events.configure(args.events, args.quiet, script="train_batch")
+    with events.run():
+        cities = args.cities or discover_cities()
+        report = run_batch(cities, args.models, cores=args.cores, jobs=args.jobs,
+                           options={"trials": args.trials, "incremental": args.incremental})
+
+        report_path = args.report or os.path.join(REPORT_DIR, f"training_report_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Run report saved to {report_path} ({report['wallSeconds']}s total)")
+        if not all(task["ok"] for task in report["tasks"]):
+            sys.exit(1)
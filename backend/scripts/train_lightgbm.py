@@ -1,46 +1,45 @@
 import sys
-city = sys.argv[1]
-print(f"Training LightGBM model for city: {city}")
+import os
+import time
+import json
+import argparse
 import pandas as pd
+from feature_store import training_features
+from feature_schema import LGB_FEATURE_NAMES
+import model_registry
+import training_events as events
 import numpy as np
 import optuna
+from concurrent.futures import ProcessPoolExecutor
 
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import lightgbm as lgb
 import joblib
 
+BASE_DIR = os.environ.get("WATTWISE_BASE_DIR", "D:/FYPs/ffyypp/ffyypp/backend")
+STUDY_DIR = f"{BASE_DIR}/optunaStudies"
+
 # ---------------------------
 # STEP A: LOAD & PREPARE TRAINING DATA
 # ---------------------------
 
-# 1. Read the training data (2015–2023)
-train_df = pd.read_csv(f"D:/FYPs/ffyypp/ffyypp/backend/trainingData/{city}_TrainingData.csv", parse_dates=["DATE"])
-train_df.sort_values("DATE", inplace=True, ignore_index=True)
-
-# 2. Create lag (24-hour) and rolling (24-hour) features for the training set
-train_df["Demand_lag24"] = train_df["Demand (MW)"].shift(24)
-train_df["Demand_roll24"] = train_df["Demand (MW)"].rolling(window=24).mean()
-
-# Drop the first 24 rows that are NaN after shift/rolling
-train_df.dropna(inplace=True)
-train_df.reset_index(drop=True, inplace=True)
-
-# 3. Select features (including newly created lag/rolling columns)
-features = [
-    "Season",
-    "TMP",
-    "HUMIDITY",
-    "Hour Number",
-    "Weekday",
-    "Month",
-    "Public Holiday",
-    "Wind Speed",
-    "Rainfall/Snowfall"
-]
-
-X_train = train_df[features]
-y_train = train_df["Demand (MW)"]
+def load_training_set(city):
+    # 1. Load the training data (2015–2023) from the feature store (parsed and derived once per CSV version)
+    features = training_features(city)
+
+    # 2. Lag (24-hour) and rolling (24-hour) demand come precomputed; keep the rows where they are
+    #    defined and no other column is missing, as the old dropna did (e.g. rows without DEW)
+    rows = features.rows(require=("Demand_lag24", "Demand_roll24"), complete=True)
+
+    # 3. Select features: the float32 model matrix is built once; the CV folds are row slices of it
+    X_train = np.ascontiguousarray(features.X[rows])
+    y_train = np.asarray(features.y[rows], dtype=np.float64)
+    return X_train, y_train, np.asarray(features.dates[rows])
+
+def load_training_data(city):
+    X_train, y_train, _ = load_training_set(city)
+    return X_train, y_train
 
 # ---------------------------
 # STEP B: USE OPTUNA FOR HYPERPARAMETER TUNING WITH TIME-SERIES SPLIT
@@ -49,57 +48,357 @@ y_train = train_df["Demand (MW)"]
 # Create a time-series cross-validator
 tscv = TimeSeriesSplit(n_splits=3)
 
-def objective(trial):
+# Intermediate values are reported on one step axis: fold k, boosting
+# iteration i -> step k * STEPS_PER_FOLD + i (i < MAX_ESTIMATORS), so every
+# trial reports the same fold/iteration at the same step. The fold MSE goes at
+# k * STEPS_PER_FOLD + MAX_ESTIMATORS, a step no iteration can reach.
+MAX_ESTIMATORS = 1000
+STEPS_PER_FOLD = MAX_ESTIMATORS + 1
+REPORT_EVERY = 25
+
+PRUNERS = {
+    "median": lambda: optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=100, interval_steps=REPORT_EVERY),
+    "percentile": lambda: optuna.pruners.PercentilePruner(25.0, n_startup_trials=5, n_warmup_steps=100, interval_steps=REPORT_EVERY),
+    "hyperband": lambda: optuna.pruners.HyperbandPruner(min_resource=4 * REPORT_EVERY, max_resource=tscv.n_splits * STEPS_PER_FOLD),
+    "none": lambda: optuna.pruners.NopPruner(),
+}
+
+def pruning_callback(trial, fold):
+    # LightGBM callback: report the validation l2 every REPORT_EVERY iterations and stop hopeless trials
+    def _callback(env):
+        if (env.iteration + 1) % REPORT_EVERY != 0:
+            return
+        for _, metric, value, _ in env.evaluation_result_list:
+            if metric == "l2":
+                trial.report(value, fold * STEPS_PER_FOLD + env.iteration)
+                if trial.should_prune():
+                    raise optuna.TrialPruned(f"fold {fold}, iteration {env.iteration + 1}: l2 {value:.2f}")
+                return
+    _callback.order = 40  # after early stopping has seen the iteration
+    return _callback
+
+def build_fold_datasets(X_train, y_train):
     """
-    Objective function that Optuna will minimize (MSE) using TimeSeriesSplit.
+    Bin the full training matrix once and cut the CV folds out of it with
+    Dataset.subset, so no trial/fold pair re-runs LightGBM's histogram binning.
+    Returns the folds as (train_set, valid_set, valid_idx) and the seconds spent binning.
     """
-    # 1) Suggest hyperparameters (expand as needed)
-    param = {
-        "random_state": 42,
-        "num_leaves": trial.suggest_int("num_leaves", 31, 127, step=32),
-        "n_estimators": trial.suggest_int("n_estimators", 100, 1000, step=100),
-        "learning_rate": trial.suggest_float("learning_rate", 1e-3, 1e-1, log=True),
-        "min_child_samples": trial.suggest_int("min_child_samples", 10, 100, step=10),
-        "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0)
-    }
-
-    # 2) Perform time-series cross-validation
-    mse_list = []
+    started = time.perf_counter()
+    # feature_pre_filter must be off: min_child_samples is tuned per trial on the same bins
+    full_set = lgb.Dataset(
+        X_train, label=y_train, feature_name=LGB_FEATURE_NAMES, free_raw_data=False,
+        params={"verbosity": -1, "feature_pre_filter": False}
+    ).construct()
+
+    folds = []
     for train_idx, valid_idx in tscv.split(X_train):
-        X_tr, X_val = X_train.iloc[train_idx], X_train.iloc[valid_idx]
-        y_tr, y_val = y_train.iloc[train_idx], y_train.iloc[valid_idx]
+        train_set = full_set.subset(train_idx).construct()
+        valid_set = full_set.subset(valid_idx).construct()
+        folds.append((train_set, valid_set, valid_idx))
+    return folds, time.perf_counter() - started
+
+def make_objective(X_train, y_train, lgb_threads, early_stopping_rounds=50):
+    with events.stage("bin_folds", rows=len(X_train)):
+        folds, bin_seconds = build_fold_datasets(X_train, y_train)
+    print(f"🧮 Binned {len(X_train)} rows into {len(folds)} CV folds in {bin_seconds:.2f}s")
+
+    def objective(trial):
+        """
+        Objective function that Optuna will minimize (MSE) using TimeSeriesSplit.
+        """
+        # 1) Suggest hyperparameters (expand as needed)
+        param = {
+            "random_state": 42,
+            "num_leaves": trial.suggest_int("num_leaves", 31, 127, step=32),
+            "n_estimators": trial.suggest_int("n_estimators", 100, MAX_ESTIMATORS, step=100),
+            "learning_rate": trial.suggest_float("learning_rate", 1e-3, 1e-1, log=True),
+            "min_child_samples": trial.suggest_int("min_child_samples", 10, 100, step=10),
+            "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0)
+        }
+
+        # Same model as LGBMRegressor(**param), expressed for the native API
+        native_param = dict(param, objective="regression", metric="l2", num_threads=lgb_threads, verbosity=-1)
+        num_boost_round = native_param.pop("n_estimators")
+
+        # 2) Perform time-series cross-validation, pruning as soon as a fold shows the trial can't win
+        mse_list = []
+        best_iterations = []
+        boost_seconds = 0.0
+        for fold, (train_set, valid_set, valid_idx) in enumerate(folds):
+            callbacks = [pruning_callback(trial, fold)]
+            if early_stopping_rounds:
+                callbacks.append(lgb.early_stopping(early_stopping_rounds, first_metric_only=True, verbose=False))
 
-        model = lgb.LGBMRegressor(**param)
-        model.fit(X_tr, y_tr, eval_set=[(X_val, y_val)])
+            started = time.perf_counter()
+            try:
+                booster = lgb.train(native_param, train_set, num_boost_round=num_boost_round,
+                                    valid_sets=[valid_set], callbacks=callbacks)
+            finally:
+                fold_seconds = time.perf_counter() - started
+                boost_seconds += fold_seconds
+                trial.set_user_attr("boost_seconds", round(boost_seconds, 3))
 
-        y_pred_val = model.predict(X_val)
-        mse_list.append(mean_squared_error(y_val, y_pred_val))
+            # Score at the best iteration when early stopping kicked in
+            best_iteration = booster.best_iteration or num_boost_round
+            y_pred_val = booster.predict(X_train[valid_idx], num_iteration=best_iteration)
+            mse_list.append(mean_squared_error(y_train[valid_idx], y_pred_val))
+            best_iterations.append(int(best_iteration))
+            events.emit("fold", trial=trial.number, fold=fold, mse=float(mse_list[-1]),
+                        best_iteration=int(best_iteration), seconds=round(fold_seconds, 3))
 
-    # 3) Return average MSE across folds
-    avg_mse = np.mean(mse_list)
-    return avg_mse
+            # Fold MSE goes in at the fold's own last step, after every boosting iteration's
+            trial.report(mse_list[-1], fold * STEPS_PER_FOLD + MAX_ESTIMATORS)
+            if trial.should_prune():
+                raise optuna.TrialPruned(f"fold {fold}: MSE {mse_list[-1]:.2f}")
 
-# Create an Optuna study (we want to minimize MSE)
-study = optuna.create_study(direction="minimize")
-# Number of trials => number of hyperparam configurations tested (adjust as needed)
-study.optimize(objective, n_trials=30)
+        # 3) Return average MSE across folds
+        trial.set_user_attr("best_iterations", best_iterations)
+        avg_mse = np.mean(mse_list)
+        return avg_mse
+    return objective
 
-# Print the best parameters found
-print("Best trial:", study.best_trial.value)
-print("Best params:", study.best_trial.params)
+def study_storage(city):
+    # One SQLite file per city, so an interrupted search resumes and later runs add to it
+    os.makedirs(STUDY_DIR, exist_ok=True)
+    safe_city = "".join(c if c.isalnum() else "_" for c in city)
+    return optuna.storages.RDBStorage(
+        f"sqlite:///{STUDY_DIR}/lgb_{safe_city}.db",
+        engine_kwargs={"connect_args": {"timeout": 60}}
+    )
 
+FINISHED_STATES = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+
+def trial_event(study, trial):
+    # study.optimize callback: one event per finished (or pruned/failed) trial
+    events.emit("trial", trial=trial.number, state=trial.state.name, value=trial.value,
+                params=trial.params, boost_seconds=trial.user_attrs.get("boost_seconds"),
+                best_iterations=trial.user_attrs.get("best_iterations"),
+                seconds=trial.duration.total_seconds() if trial.duration else None)
+
+def finished_trials(study):
+    return len(study.get_trials(deepcopy=False, states=FINISHED_STATES))
+
+def tuning_worker(city, study_name, target, lgb_threads, pruner="median", early_stopping_rounds=50):
+    # Runs in its own process: load the data, attach to the shared study and
+    # keep going until the study as a whole has `target` finished trials
+    X_train, y_train = load_training_data(city)
+    study = optuna.load_study(study_name=study_name, storage=study_storage(city), pruner=PRUNERS[pruner]())
+    study.optimize(
+        make_objective(X_train, y_train, lgb_threads, early_stopping_rounds),
+        callbacks=[optuna.study.MaxTrialsCallback(target, states=FINISHED_STATES), trial_event]
+    )
+    return finished_trials(study)
+
+def tune(city, n_trials=30, n_jobs=1, cpus=None, pruner="median", early_stopping_rounds=50, fresh=False):
+    """
+    Add n_trials finished trials to the city's Optuna study (created on first
+    use, otherwise extended, so every retrain searches further). n_jobs worker processes share the CPU budget, and each trial's
+    LightGBM gets cpus // n_jobs threads so the machine is never oversubscribed.
+    Trials are pruned by `pruner` (see PRUNERS) and each fold stops boosting
+    after early_stopping_rounds without improvement (0 disables it).
+    fresh=True drops the stored trials first (their scores were measured on old data).
+    """
+    cpus = max(1, cpus or os.cpu_count() or 1)
+    n_jobs = max(1, min(n_jobs, cpus))
+    lgb_threads = max(1, cpus // n_jobs)
+
+    study_name = f"lgb_{city}"
+    if fresh:
+        try:
+            optuna.delete_study(study_name=study_name, storage=study_storage(city))
+        except KeyError:
+            pass
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=study_storage(city),
+        direction="minimize",
+        pruner=PRUNERS[pruner](),
+        load_if_exists=True
+    )
+    done = finished_trials(study)
+    target = done + max(0, n_trials)
+    print(f"📚 Study '{study_name}': {done} finished trials, running {target - done} more "
+          f"({n_jobs} worker(s) x {lgb_threads} LightGBM thread(s))")
+
+    if done < target:
+        if n_jobs == 1:
+            tuning_worker(city, study_name, target, lgb_threads, pruner, early_stopping_rounds)
+        else:
+            # Workers only log warnings so their trial logs don't interleave
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=optuna.logging.set_verbosity,
+                                     initargs=(optuna.logging.WARNING,)) as pool:
+                futures = [pool.submit(tuning_worker, city, study_name, target, lgb_threads,
+                                       pruner, early_stopping_rounds)
+                           for _ in range(n_jobs)]
+                for future in futures:
+                    future.result()
+
+    study = optuna.load_study(study_name=study_name, storage=study_storage(city))
+    trials = study.get_trials(deepcopy=False, states=FINISHED_STATES)
+    pruned = sum(t.state == optuna.trial.TrialState.PRUNED for t in trials)
+    boost_seconds = sum(t.user_attrs.get("boost_seconds", 0.0) for t in trials)
+    print(f"✂️ {pruned} of {len(trials)} trials pruned")
+    print(f"⏱️ Boosting time across all trials: {boost_seconds:.2f}s")
+    return study
 
 # ---------------------------
 # STEP C: TRAIN FINAL MODEL ON ALL TRAINING DATA WITH BEST PARAMS
 # ---------------------------
-best_params = study.best_trial.params
-best_params["random_state"] = 42  # ensure reproducibility
 
-final_model = lgb.LGBMRegressor(**best_params)
-final_model.fit(X_train, y_train)
+def final_params(trial):
+    # The trial was scored at each fold's early-stopped iteration, so fit the
+    # final model with that many rounds (the largest fold, as it sees all rows)
+    params = dict(trial.params)
+    best_iterations = trial.user_attrs.get("best_iterations")
+    if best_iterations:
+        params["n_estimators"] = int(max(best_iterations))
+    return params
+
+def train_final_model(X_train, y_train, best_params, cpus=None):
+    best_params = dict(best_params)
+    best_params["random_state"] = 42  # ensure reproducibility
+
+    final_model = lgb.LGBMRegressor(**best_params, n_jobs=cpus or -1)
+    final_model.fit(X_train, y_train, feature_name=LGB_FEATURE_NAMES)
+    return final_model
+
+# ---------------------------
+# STEP D: INCREMENTAL UPDATE OF AN EXISTING MODEL
+# ---------------------------
+
+def model_paths(city):
+    # The .json next to the model records what it was trained on, for incremental updates
+    base = f"{BASE_DIR}/trainedModels/lgb_optuna_final_model_{city}"
+    return base + ".pkl", base + ".json"
+
+def save_model(city, model, meta):
+    model_path, meta_path = model_paths(city)
+    joblib.dump(model, model_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    # Native text booster + manifest for the prediction scripts (promote lgb_<city> to serve it)
+    registered = model_registry.register_lightgbm(
+        f"lgb_{city}", model,
+        training_data=f"{BASE_DIR}/trainingData/{city}_TrainingData.csv",
+        metrics={k: meta[k] for k in ("cv_mse", "last_update_mse", "rows", "trained_until") if k in meta},
+    )
+    print(f"🏷️ Registered lgb_{city}@{registered['version']}")
+
+def incremental_update(city, drift_threshold=1.5, extra_rounds=100, cpus=None):
+    """
+    Continue boosting the saved model on the rows that arrived after it was
+    trained, keeping its hyperparameters. Returns "updated" (or "up_to_date"),
+    or the reason a full search is needed instead: "no_model" when there is no
+    saved model/metadata, "drift" when the model's MSE on the new rows exceeds
+    drift_threshold x its cross-validation MSE.
+    """
+    model_path, meta_path = model_paths(city)
+    if not (os.path.exists(model_path) and os.path.exists(meta_path)):
+        print("⚠️ No saved model metadata for an incremental update, running a full search")
+        return "no_model"
+
+    model = joblib.load(model_path)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    with events.stage("load_data"):
+        X_train, y_train, dates = load_training_set(city)
+    new_rows = dates > np.datetime64(pd.Timestamp(meta["trained_until"]))
+    if not new_rows.any():
+        print(f"✅ No rows after {meta['trained_until']}, model is up to date")
+        return "up_to_date"
+
+    X_new, y_new = X_train[new_rows], y_train[new_rows]
+
+    # Drift check: error of the current model on data it has never seen
+    new_mse = mean_squared_error(y_new, model.booster_.predict(X_new))
+    drift = new_mse / meta["cv_mse"]
+    print(f"🔍 {len(y_new)} new rows: MSE {new_mse:.2f} vs CV MSE {meta['cv_mse']:.2f} (x{drift:.2f})")
+    events.emit("drift_check", new_rows=int(len(y_new)), mse=float(new_mse), cv_mse=meta["cv_mse"], ratio=float(drift))
+    if drift > drift_threshold:
+        print(f"⚠️ Drift above x{drift_threshold}, running a full search")
+        return "drift"
+
+    started = time.perf_counter()
+    params = dict(meta["params"], random_state=42, n_estimators=extra_rounds)
+    updated = lgb.LGBMRegressor(**params, n_jobs=cpus or -1, verbose=-1)
+    with events.stage("incremental_fit", rows=int(len(y_new)), rounds=extra_rounds):
+        updated.fit(X_new, y_new, feature_name=LGB_FEATURE_NAMES, init_model=model.booster_)
+    print(f"⚡ Added {extra_rounds} boosting rounds on the new rows in {time.perf_counter() - started:.2f}s")
+
+    # rows and trained_until describe the same training set: everything up to the newest row
+    meta.update({
+        "trained_until": str(pd.Timestamp(dates[new_rows].max())),
+        "rows": int(len(y_train)),
+        "incremental_updates": meta.get("incremental_updates", 0) + 1,
+        "last_update_mse": new_mse,
+    })
+    with events.stage("save"):
+        save_model(city, updated, meta)
+    print(f"\nModel updated as 'lgb_optuna_final_model_{city}.pkl'")
+    return "updated"
+
 # ---------------------------
-# STEP E: SAVE MODEL FOR FUTURE PREDICTIONS
+# STEP E: FULL TRAINING RUN (SEARCH + FINAL FIT + SAVE)
 # ---------------------------
 
-joblib.dump(final_model, f"D:/FYPs/ffyypp/ffyypp/backend/trainedModels/lgb_optuna_final_model_{city}.pkl")
-print("\nModel saved as 'lgb_optuna_final_model.pkl'")
\ No newline at end of file
+def train_city(city, n_trials=30, n_jobs=1, cpus=None, pruner="median", early_stopping_rounds=50, fresh=False):
+    with events.stage("load_data"):
+        X_train, y_train, dates = load_training_set(city)
+    with events.stage("tune", n_trials=n_trials, n_jobs=n_jobs):
+        study = tune(city, n_trials=n_trials, n_jobs=n_jobs, cpus=cpus,
+                     pruner=pruner, early_stopping_rounds=early_stopping_rounds, fresh=fresh)
+
+    # Print the best parameters found
+    print("Best trial:", study.best_trial.value)
+    print("Best params:", study.best_trial.params)
+    params = final_params(study.best_trial)
+    print(f"🌲 Final fit with {params['n_estimators']} boosting rounds")
+
+    with events.stage("final_fit", rows=len(y_train), n_estimators=params["n_estimators"]):
+        final_model = train_final_model(X_train, y_train, params, cpus=cpus)
+
+    # Save model for future predictions
+    with events.stage("save"):
+        save_model(city, final_model, {
+            "trained_until": str(pd.Timestamp(dates.max())),
+            "rows": len(y_train),
+            "params": params,
+            "cv_mse": study.best_trial.value,
+        })
+    print("\nModel saved as 'lgb_optuna_final_model.pkl'")
+    return final_model, study
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the LightGBM demand model for a city")
+    parser.add_argument("city")
+    parser.add_argument("--trials", type=int, default=30, help="trials added to the study on this run")
+    parser.add_argument("--n-jobs", type=int, default=1, help="parallel tuning processes")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU budget shared by all workers")
+    parser.add_argument("--pruner", choices=sorted(PRUNERS), default="median", help="Optuna pruner for bad trials")
+    parser.add_argument("--early-stopping", type=int, default=50, help="rounds without improvement before a fold stops (0 = off)")
+    parser.add_argument("--incremental", action="store_true", help="continue boosting the saved model on new rows")
+    parser.add_argument("--drift-threshold", type=float, default=1.5, help="new-row MSE / CV MSE that forces a full search")
+    parser.add_argument("--extra-rounds", type=int, default=100, help="boosting rounds added by an incremental update")
+    events.add_arguments(parser)
+    args = parser.parse_args()
+
+    city = args.city
+    events.configure(args.events, args.quiet, script="train_lightgbm", city=city)
+    if args.quiet:
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+    print(f"Training LightGBM model for city: {city}")
+
+    with events.run():
+        fresh = False
+        if args.incremental:
+            with events.stage("incremental_update"):
+                outcome = incremental_update(city, args.drift_threshold, args.extra_rounds, cpus=args.cpus)
+            events.emit("incremental_outcome", outcome=outcome)
+            if outcome in ("updated", "up_to_date"):
+                sys.exit(0)
+            fresh = outcome == "drift"  # stored trial scores no longer describe the data
+
+        train_city(city, n_trials=args.trials, n_jobs=args.n_jobs, cpus=args.cpus,
+                   pruner=args.pruner, early_stopping_rounds=args.early_stopping, fresh=fresh)
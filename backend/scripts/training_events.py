@@ -0,0 +1,162 @@
+import sys
+import os
+import json
+import time
+import contextlib
+
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+# Machine-readable progress/timing events for the training scripts.
+#
+# Each event is one JSON object per line:
+#   {"event": "stage_end", "stage": "tune", "seconds": 12.3, "peakRssMb": 410.2,
+#    "script": "train_lightgbm", "city": "EL PASO", "ts": 1718000000.0, "elapsed": 14.1}
+# Events: run_start/run_end, stage_start/stage_end, fold and trial (Optuna),
+# epoch (Keras). Nothing is written until configure() is called, so the
+# scripts behave as before without --events.
+#
+# The settings are kept in environment variables, so worker processes started
+# by the training scripts (Optuna workers, train_batch) emit to the same place.
+
+EVENTS_ENV = "WATTWISE_EVENTS"
+QUIET_ENV = "WATTWISE_EVENTS_QUIET"
+CONTEXT_ENV = "WATTWISE_EVENTS_CONTEXT"
+
+_stream = None
+_context = {}
+_started = time.time()
+
+def _proc_status_mb(field):
+    # VmRSS / VmHWM from /proc/self/status (Linux), None elsewhere
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)  # kB
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss():
+    # Start a new peak: on Linux writing 5 to clear_refs resets VmHWM to the
+    # current RSS. Returns False where the peak can't be reset (e.g. Windows).
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def rss_mb():
+    # Current resident memory of this process
+    current = _proc_status_mb("VmRSS")
+    if current is not None:
+        return current
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / 1e6, 1)
+    except ImportError:
+        return None
+
+def peak_rss_mb():
+    # Peak resident memory of this process so far (since reset_peak_rss() on Linux)
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    if resource is not None:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KB on Linux
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 1e6, 1)
+    except ImportError:
+        return None
+
+def configure(target=None, quiet=False, **context):
+    """
+    target: "-" for stdout, a file path (appended to), or None for no events.
+    quiet: drop the human-readable output (prints, progress bars) so stdout
+    only carries events. context (script, city, ...) is added to every event.
+    """
+    global _stream, _context
+    if target:
+        os.environ[EVENTS_ENV] = target
+        os.environ[CONTEXT_ENV] = json.dumps(context)
+    if quiet:
+        os.environ[QUIET_ENV] = "1"
+    _context = context
+
+    if quiet and sys.stdout is sys.__stdout__:
+        sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    if target == "-":
+        _stream = sys.__stdout__
+    elif target:
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        _stream = open(target, "a", encoding="utf-8", buffering=1)
+
+def _configure_from_env():
+    # Worker processes inherit the parent's settings
+    target = os.environ.get(EVENTS_ENV)
+    if target or os.environ.get(QUIET_ENV):
+        configure(target, quiet=bool(os.environ.get(QUIET_ENV)),
+                  **json.loads(os.environ.get(CONTEXT_ENV) or "{}"))
+
+def set_context(**fields):
+    # e.g. the city/model of the task a batch worker is running now
+    _context.update(fields)
+
+def enabled():
+    return _stream is not None
+
+def quiet():
+    return bool(os.environ.get(QUIET_ENV))
+
+def emit(event, **fields):
+    if _stream is None:
+        return
+    now = time.time()
+    record = {"event": event, **_context, **fields,
+              "ts": round(now, 3), "elapsed": round(now - _started, 3), "pid": os.getpid()}
+    _stream.write(json.dumps(record, default=str) + "\n")
+    _stream.flush()
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    # stage_start / stage_end around a block, with its duration and the peak memory after it
+    emit("stage_start", stage=name, **fields)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        emit("stage_end", stage=name, ok=False, error=str(e),
+             seconds=round(time.perf_counter() - started, 3), peakRssMb=peak_rss_mb(), **fields)
+        raise
+    emit("stage_end", stage=name, ok=True,
+         seconds=round(time.perf_counter() - started, 3), peakRssMb=peak_rss_mb(), **fields)
+
+@contextlib.contextmanager
+def run(**fields):
+    # run_start / run_end around a whole script
+    emit("run_start", argv=sys.argv[1:], **fields)
+    started = time.perf_counter()
+    try:
+        yield
+    except SystemExit as e:
+        emit("run_end", ok=not e.code, seconds=round(time.perf_counter() - started, 3),
+             peakRssMb=peak_rss_mb(), **fields)
+        raise
+    except BaseException as e:
+        emit("run_end", ok=False, error=str(e), seconds=round(time.perf_counter() - started, 3),
+             peakRssMb=peak_rss_mb(), **fields)
+        raise
+    emit("run_end", ok=True, seconds=round(time.perf_counter() - started, 3), peakRssMb=peak_rss_mb(), **fields)
+
+def add_arguments(parser):
+    parser.add_argument("--events", default=None, metavar="PATH",
+                        help='write JSON-lines progress events to PATH ("-" = stdout)')
+    parser.add_argument("--quiet", action="store_true", help="no human-readable output (use with --events -)")
+
+_configure_from_env()
@@ -1,4 +1,5 @@
 import pandas as pd
+from dataset_cache import read_dataset
 import numpy as np
 import json
 import sys
@@ -25,7 +26,7 @@ if not os.path.exists(data_path):
 # -------------------------------
 # 1. Load and Prepare the Data
 # -------------------------------
-df = pd.read_csv(data_path)
+df = read_dataset(data_path)
 
 # Convert 'DATE' to datetime and sort
 df['DATE'] = pd.to_datetime(df['DATE'])
@@ -191,6 +191,32 @@ app.get('/api/generate-chart-image/:city', (req, res) => {
 });
 
 
+// SHAP explanations run as their own job instead of at the end of training;
+// the summary plot and per-feature importance are published under /static/shap
+app.post('/api/explain-model', (req, res) => {
+  const { cityName, model } = req.body;
+
+  if (!cityName || (model !== 'ann' && model !== 'lgb')) {
+    return res.status(400).json({ error: 'City name and model (ann or lgb) are required' });
+  }
+
+  exec(`python ./scripts/explain_model.py "${cityName}" --model ${model}`, (err, stdout) => {
+    if (err) {
+      console.error('Explain Script Error:', err);
+      return res.status(500).json({ error: 'Explanation job failed' });
+    }
+
+    try {
+      // The summary JSON is the last line of the script output
+      const lines = stdout.trim().split('\n');
+      res.status(200).json(JSON.parse(lines[lines.length - 1]));
+    } catch (parseErr) {
+      console.error('JSON Parse Error:', parseErr);
+      res.status(500).json({ error: 'Failed to parse explanation summary' });
+    }
+  });
+});
+
 app.get('/api/actual-vs-predicted/:city', async (req, res) => {
   const { city } = req.params;
   const { exec } = await import('child_process');
@@ -278,7 +304,11 @@ app.get('/api/prediction-result/:city', async (req, res) => {
 app.get('/api/model-specs/:city', async (req, res) => {
   try {
     const { city } = req.params;
-    const specs = await mongoose.connection.db.collection('model_specs').findOne({ city });
+    // Summaries are stored per city and model type; without ?modelType= return the latest one
+    const query = req.query.modelType ? { city, modelType: req.query.modelType } : { city };
+    const specs = await mongoose.connection.db
+      .collection('model_specs')
+      .findOne(query, { sort: { timestamp: -1 } });
 
     if (!specs) return res.status(404).json({ error: 'No specs found for this city' });
 
@@ -289,6 +319,64 @@ app.get('/api/model-specs/:city', async (req, res) => {
   }
 });
 
+// Persistent forecasting worker: models are loaded once and reused across
+// /api/predict calls (reloaded by the worker when the model files change)
+let forecastWorker = null;
+let forecastRequestId = 0;
+const pendingForecasts = new Map();
+
+function getForecastWorker() {
+  if (forecastWorker) return forecastWorker;
+
+  forecastWorker = spawn('python', ['./scripts/forecast_worker.py']);
+  forecastWorker.stdout.setEncoding('utf8');
+
+  let buffered = '';
+  forecastWorker.stdout.on('data', (data) => {
+    buffered += data;
+    let newline;
+    while ((newline = buffered.indexOf('\n')) >= 0) {
+      const line = buffered.slice(0, newline).trim();
+      buffered = buffered.slice(newline + 1);
+      if (!line) continue;
+
+      try {
+        const message = JSON.parse(line);
+        const pending = pendingForecasts.get(message.id);
+        if (pending) {
+          pendingForecasts.delete(message.id);
+          pending.resolve(message);
+        }
+      } catch (e) {
+        console.warn(`⚠️ Forecast Worker Output: ${line}`);
+      }
+    }
+  });
+
+  forecastWorker.stderr.on('data', (data) => {
+    console.warn(`⚠️ Forecast Worker Warning: ${data.toString()}`);
+  });
+
+  forecastWorker.on('close', (code) => {
+    console.error(`❌ Forecast worker exited with code ${code}`);
+    for (const pending of pendingForecasts.values()) {
+      pending.reject(new Error(`Forecast worker exited with code ${code}`));
+    }
+    pendingForecasts.clear();
+    forecastWorker = null;
+  });
+
+  return forecastWorker;
+}
+
+function requestForecast(params) {
+  return new Promise((resolve, reject) => {
+    const id = ++forecastRequestId;
+    pendingForecasts.set(id, { resolve, reject });
+    getForecastWorker().stdin.write(JSON.stringify({ id, ...params }) + '\n');
+  });
+}
+
 app.post('/api/predict', async (req, res) => {
   try {
     const { cityName, startDate, endDate, modelType } = req.body;
@@ -297,31 +385,19 @@ app.post('/api/predict', async (req, res) => {
       return res.status(400).json({ error: 'All fields are required' });
     }
 
-    let scriptPath = '';
-    if (modelType === 'fast') {
-      scriptPath = './scripts/predict_fast.py';
-    } else if (modelType === 'hybrid') {
-      scriptPath = './scripts/predict_hybrid.py';
-    } else {
+    if (modelType !== 'fast' && modelType !== 'hybrid') {
       return res.status(400).json({ error: 'Invalid model type' });
     }
 
-    const { exec } = await import('child_process');
-    const command = `python ${scriptPath} "${cityName}" "${startDate}" "${endDate}"`;
-
     console.log(`✅ Prediction Script Started\n`)
-    exec(command, (err, stdout, stderr) => {
-      if (err) {
-        console.error(`❌ Prediction Script Error: ${err.message}`);
-        return res.status(500).json({ error: 'Prediction failed' });
-      }
-      if (stderr) {
-        console.warn(`⚠️ Prediction Script Warning: ${stderr}`);
-      }
+    const result = await requestForecast({ cityName, startDate, endDate, modelType });
+    if (!result.ok) {
+      console.error(`❌ Prediction Script Error: ${result.error}`);
+      return res.status(500).json({ error: 'Prediction failed' });
+    }
 
-      console.log(`✅ Prediction Script Output:\n${stdout}`);
-      res.status(200).json({ message: `Prediction complete using ${modelType} model`, output: stdout });
-    });
+    console.log(`✅ Prediction Script Output (${result.seconds}s, models ${result.reloaded ? 'loaded' : 'warm'}):\n${result.output}`);
+    res.status(200).json({ message: `Prediction complete using ${modelType} model`, output: result.output });
   } catch (err) {
     console.error('Prediction Route Error:', err);
     res.status(500).json({ error: '❌ Failed to execute prediction' });
@@ -388,11 +464,43 @@ app.post('/api/train-model', async (req, res) => {
     fs.writeFileSync(saveFile, buffer);
     console.log(`✅ Training file saved at: ${saveFile}`);
 
-    // ✅ STEP 2: Spawn the Python training script
-    const pythonProcess = spawn('python', [scriptPath, cityName]);
+    // ✅ STEP 2: Spawn the Python training script; it reports progress as JSON-lines events
+    const pythonProcess = spawn('python', [scriptPath, cityName, '--events', '-', '--quiet']);
+
+    // Events are kept for the latency dashboards (one JSON object per line, appended across runs)
+    const eventsFile = path.join(__dirname, 'Result', 'training_events.jsonl');
+    if (!fs.existsSync(path.dirname(eventsFile))) fs.mkdirSync(path.dirname(eventsFile), { recursive: true });
+    const stages = {};
+    let runEnd = null;
+    let pending = '';
+
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      let event;
+      try {
+        event = JSON.parse(line);
+      } catch {
+        console.log(`📤 STDOUT: ${line}`);
+        return;
+      }
+      fs.appendFileSync(eventsFile, line.trim() + '\n');
+      if (event.event === 'stage_end') {
+        stages[event.stage] = (stages[event.stage] || 0) + event.seconds;
+        console.log(`⏱️ ${cityName} ${modelType} ${event.stage}: ${event.seconds}s (peak ${event.peakRssMb} MB)`);
+      } else if (event.event === 'trial') {
+        console.log(`🔎 Trial ${event.trial} ${event.state}: ${event.value}`);
+      } else if (event.event === 'epoch') {
+        console.log(`📈 Epoch ${event.epoch}: loss ${event.loss}, val_loss ${event.val_loss}, ${event.samples_per_sec} samples/s`);
+      } else if (event.event === 'run_end') {
+        runEnd = event;
+      }
+    };
 
     pythonProcess.stdout.on('data', (data) => {
-      console.log(`📤 STDOUT: ${data.toString()}`);
+      // Chunks can split a line; only complete lines are parsed
+      const lines = (pending + data.toString()).split(/\r?\n/);
+      pending = lines.pop();
+      lines.forEach(handleLine);
     });
 
     pythonProcess.stderr.on('data', (data) => {
@@ -400,9 +508,15 @@ app.post('/api/train-model', async (req, res) => {
     });
 
     pythonProcess.on('close', (code) => {
+      handleLine(pending);
       if (code === 0) {
         console.log(`✅ Training completed successfully.`);
-        return res.status(200).json({ message: `Model training for ${modelType} on ${cityName} completed.` });
+        return res.status(200).json({
+          message: `Model training for ${modelType} on ${cityName} completed.`,
+          seconds: runEnd ? runEnd.seconds : null,
+          peakRssMb: runEnd ? runEnd.peakRssMb : null,
+          stages,
+        });
       } else {
         console.error(`❌ Training process exited with code ${code}`);
         return res.status(500).json({ error: `Training process exited with code ${code}` });
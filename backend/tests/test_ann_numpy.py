@@ -0,0 +1,55 @@
+import os
+import numpy as np
+import pytest
+
+from ann_numpy import ACTIVATIONS, export_ann_weights, is_current, load_numpy_ann, _layer_weights, _model_layers
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+H5_PATH = os.path.join(BACKEND_DIR, "bestModels", "ann_best_model_optuna_hybrid.h5")
+NPZ_PATH = os.path.join(BACKEND_DIR, "bestModels", "ann_best_model_optuna_hybrid.npz")
+
+def random_inputs(n_features, n_samples=2048, seed=42):
+    # MinMax-scaled features live in [0, 1]
+    return np.random.default_rng(seed).random((n_samples, n_features), dtype=np.float32)
+
+def reference_predict(h5_path, X):
+    # Layer-by-layer forward pass straight from the .h5 weights, BatchNormalization not folded
+    h5py = pytest.importorskip("h5py")
+    h = X.astype(np.float64)
+    with h5py.File(h5_path, "r") as f:
+        for class_name, config in _model_layers(f):
+            if class_name in ("InputLayer", "Dropout"):
+                continue
+            weights = _layer_weights(f["model_weights"][config["name"]])
+            if class_name == "BatchNormalization":
+                h = (h - weights["moving_mean"]) / np.sqrt(weights["moving_variance"] + config["epsilon"])
+                h = h * weights.get("gamma", 1.0) + weights.get("beta", 0.0)
+            else:
+                h = ACTIVATIONS[config.get("activation", "linear")](h @ weights["kernel"] + weights.get("bias", 0.0))
+    return h
+
+def test_committed_npz_is_built_from_committed_h5():
+    pytest.importorskip("h5py")
+    assert is_current(NPZ_PATH, H5_PATH)
+
+def test_committed_npz_matches_reference_forward_pass():
+    model = load_numpy_ann(NPZ_PATH)
+    X = random_inputs(model.kernels[0].shape[0])
+    np.testing.assert_allclose(model.predict(X), reference_predict(H5_PATH, X), rtol=1e-4, atol=1e-3)
+
+def test_committed_npz_matches_keras():
+    pytest.importorskip("tensorflow")
+    from tensorflow.keras.models import load_model
+
+    model = load_numpy_ann(NPZ_PATH)
+    X = random_inputs(model.kernels[0].shape[0])
+    expected = load_model(H5_PATH, compile=False).predict(X, verbose=0)
+    np.testing.assert_allclose(model.predict(X), expected, rtol=1e-4, atol=1e-3)
+
+def test_export_is_deterministic(tmp_path):
+    pytest.importorskip("h5py")
+    exported = load_numpy_ann(export_ann_weights(H5_PATH, str(tmp_path / "ann.npz")))
+    committed = load_numpy_ann(NPZ_PATH)
+    assert exported.activations == committed.activations
+    for new, old in zip(exported.kernels + exported.biases, committed.kernels + committed.biases):
+        np.testing.assert_array_equal(new, old)
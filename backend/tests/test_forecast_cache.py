@@ -0,0 +1,32 @@
+import os
+import numpy as np
+import pandas as pd
+
+from forecast_cache import load_forecast, store_forecast
+
+KEY_A = "a" * 64
+KEY_B = "b" * 64
+
+def forecast_frame():
+    return pd.DataFrame({
+        "DATE": pd.date_range("2024-03-01", periods=4, freq="h"),
+        "Predicted Demand": [810.5, np.nan, 790.25, 802.0],
+        "Holiday": pd.Series(["New Year", np.nan, "", "Easter"], dtype=object),
+    })
+
+def test_round_trip_keeps_missing_text_as_nan(tmp_path):
+    df = forecast_frame()
+    store_forecast(str(tmp_path), "EL PASO", "fast", KEY_A, df)
+    loaded = load_forecast(str(tmp_path), "EL PASO", "fast", KEY_A)
+    pd.testing.assert_frame_equal(loaded, df)
+    assert loaded["Holiday"].isna().tolist() == [False, True, False, False]
+
+def test_new_entry_replaces_only_its_own_city(tmp_path):
+    store_forecast(str(tmp_path), "EL PASO", "fast", KEY_A, forecast_frame())
+    store_forecast(str(tmp_path), "EL_PASO", "fast", KEY_A, forecast_frame())
+    store_forecast(str(tmp_path), "EL PASO", "fast", KEY_B, forecast_frame())
+
+    assert load_forecast(str(tmp_path), "EL PASO", "fast", KEY_A) is None
+    assert load_forecast(str(tmp_path), "EL PASO", "fast", KEY_B) is not None
+    assert load_forecast(str(tmp_path), "EL_PASO", "fast", KEY_A) is not None
+    assert len(os.listdir(tmp_path)) == 2
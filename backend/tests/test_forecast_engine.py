@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import recursive_forecast
+
+LAG_HOURS = 24
+DEMAND = "Demand (MW)"
+
+class StubModel:
+    # Linear model over the feature columns, so every input feeds the prediction
+    def __init__(self, n_features):
+        self.weights = np.linspace(0.5, 1.5, n_features)
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return np.nan_to_num(np.asarray(X, dtype=np.float64)) @ self.weights + 100.0
+
+def synthetic_frames(hours=120, future_demand=False, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=LAG_HOURS + hours, freq="h")
+    frame = pd.DataFrame({
+        "DATE": dates,
+        "TMP": rng.normal(20, 5, len(dates)),
+        "Hour Number": dates.hour,
+        DEMAND: rng.normal(900, 50, len(dates)),
+    })
+    bridge_df = frame.iloc[:LAG_HOURS].reset_index(drop=True)
+    future_df = frame.iloc[LAG_HOURS:].reset_index(drop=True)
+    if not future_demand:
+        future_df = future_df.drop(columns=[DEMAND])
+    return bridge_df, future_df
+
+def concat_loop_forecast(model, bridge_df, future_df, features, lag_hours=LAG_HOURS):
+    # The per-row pd.concat loop recursive_forecast replaced, kept as the reference
+    history_df = bridge_df.copy()
+    predictions_list = []
+
+    for i in range(len(future_df)):
+        future_row = future_df.iloc[[i]].copy()
+        if DEMAND not in future_row.columns:
+            future_row[DEMAND] = np.nan
+
+        combined = pd.concat([history_df.tail(lag_hours), future_row], ignore_index=True)
+        combined["Demand_lag24"] = combined[DEMAND].shift(lag_hours)
+        combined["Demand_roll24"] = combined[DEMAND].rolling(window=lag_hours, min_periods=1).mean()
+
+        row_to_predict = combined.iloc[[-1]].copy()
+        y_pred = model.predict(row_to_predict[features])[0]
+
+        combined.at[combined.index[-1], DEMAND] = y_pred
+        predicted_row = combined.iloc[[-1]].copy()
+        predicted_row["Predicted Demand"] = y_pred
+        predictions_list.append(predicted_row)
+        history_df = pd.concat([history_df, predicted_row], ignore_index=True)
+
+    pred_df = pd.concat(predictions_list, ignore_index=True)
+    pred_df.sort_values("DATE", inplace=True)
+    pred_df.reset_index(drop=True, inplace=True)
+    return pred_df
+
+FEATURE_SETS = {
+    "lag_and_roll": ["TMP", "Hour Number", "Demand_lag24", "Demand_roll24"],
+    "lag_only": ["TMP", "Hour Number", "Demand_lag24"],
+    "no_demand": ["TMP", "Hour Number"],
+}
+
+@pytest.mark.parametrize("future_demand", [False, True])
+@pytest.mark.parametrize("features", FEATURE_SETS.values(), ids=FEATURE_SETS.keys())
+def test_recursive_forecast_matches_concat_loop(features, future_demand):
+    bridge_df, future_df = synthetic_frames(future_demand=future_demand)
+    expected = concat_loop_forecast(StubModel(len(features)), bridge_df, future_df, features)
+    result = recursive_forecast(StubModel(len(features)), bridge_df, future_df, features, block_size=1)
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_series_equal(result["DATE"], expected["DATE"])
+    for col in [DEMAND, "Demand_lag24", "Demand_roll24", "Predicted Demand"]:
+        np.testing.assert_allclose(result[col].to_numpy(dtype=np.float64), expected[col].to_numpy(dtype=np.float64),
+                                   rtol=1e-9, atol=1e-6, equal_nan=True, err_msg=col)
+
+@pytest.mark.parametrize("block_size", [1, 2, 7, 23, 24, None])
+def test_lag_blocks_up_to_lag_hours_match_one_row_at_a_time(block_size):
+    features = FEATURE_SETS["lag_only"]
+    bridge_df, future_df = synthetic_frames(hours=100)
+    expected = recursive_forecast(StubModel(len(features)), bridge_df, future_df, features, block_size=1)
+
+    model = StubModel(len(features))
+    result = recursive_forecast(model, bridge_df, future_df, features, block_size=block_size)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+    assert model.calls == -(-len(future_df) // (block_size or LAG_HOURS))
+
+@pytest.mark.parametrize("features, block_size, safe_block", [
+    (FEATURE_SETS["lag_only"], 25, LAG_HOURS),
+    (FEATURE_SETS["lag_only"], 1000, LAG_HOURS),
+    (FEATURE_SETS["lag_and_roll"], LAG_HOURS, 1),
+    (FEATURE_SETS["no_demand"], 1000, 1000),
+], ids=["lag_25", "lag_1000", "roll_24", "no_demand_1000"])
+def test_unsafe_block_sizes_are_clamped(features, block_size, safe_block):
+    bridge_df, future_df = synthetic_frames(hours=100)
+    expected = recursive_forecast(StubModel(len(features)), bridge_df, future_df, features, block_size=1)
+
+    model = StubModel(len(features))
+    result = recursive_forecast(model, bridge_df, future_df, features, block_size=block_size)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+    assert model.calls == -(-len(future_df) // safe_block)
+
+def test_features_without_demand_predict_the_horizon_in_one_call():
+    features = FEATURE_SETS["no_demand"]
+    bridge_df, future_df = synthetic_frames(hours=100)
+    model = StubModel(len(features))
+    recursive_forecast(model, bridge_df, future_df, features)
+    assert model.calls == 1
@@ -0,0 +1,51 @@
+import os
+import time
+import numpy as np
+import pytest
+
+lgb = pytest.importorskip("lightgbm")
+joblib = pytest.importorskip("joblib")
+
+import model_registry
+
+def fit_model(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.random((200, 4))
+    y = X @ rng.random(4)
+    return lgb.LGBMRegressor(n_estimators=5, verbose=-1).fit(X, y)
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    # A registry with one legacy LightGBM pickle, both under tmp_path
+    legacy_path = str(tmp_path / "bestModels" / "lgb_legacy.pkl")
+    os.makedirs(os.path.dirname(legacy_path))
+    joblib.dump(fit_model(0), legacy_path)
+    monkeypatch.setattr(model_registry, "REGISTRY_DIR", str(tmp_path / "modelRegistry"))
+    monkeypatch.setitem(model_registry.LEGACY_ARTIFACTS, "lgb_legacy", {"kind": "lightgbm", "model": legacy_path})
+    return legacy_path
+
+def test_legacy_model_is_imported_on_first_use(registry):
+    m = model_registry.manifest("lgb_legacy")
+    assert m["source"] == registry
+    assert m["sourceFiles"][registry]["sha256"] == model_registry.file_sha256(registry)
+    assert model_registry.manifest("lgb_legacy")["version"] == m["version"]
+
+def test_replaced_legacy_file_is_reimported_as_new_version(registry):
+    first = model_registry.manifest("lgb_legacy")["version"]
+    joblib.dump(fit_model(1), registry)
+    second = model_registry.manifest("lgb_legacy")["version"]
+    assert second != first
+    assert os.path.isdir(model_registry.artifact_dir("lgb_legacy", first))
+    assert model_registry.manifest("lgb_legacy")["version"] == second
+
+def test_touched_legacy_file_is_not_reimported(registry, monkeypatch):
+    first = model_registry.manifest("lgb_legacy")
+    os.utime(registry, ns=(time.time_ns(), time.time_ns() + 10**9))
+    monkeypatch.setattr(model_registry, "import_legacy", lambda name: pytest.fail("re-imported"))
+    assert model_registry.manifest("lgb_legacy")["version"] == first["version"]
+
+def test_promoted_version_is_kept_when_legacy_file_changes(registry):
+    model_registry.manifest("lgb_legacy")
+    promoted = model_registry.register_lightgbm("lgb_legacy", fit_model(2))
+    joblib.dump(fit_model(3), registry)
+    assert model_registry.manifest("lgb_legacy")["version"] == promoted["version"]
@@ -0,0 +1,97 @@
+import os
+import datetime
+import pytest
+from pymongo import ReplaceOne
+
+import summary_store
+
+SUMMARY = {"expectedUsage": 1.0, "percentChange": 0.1, "confidence": 90,
+           "peakDay": "2024-06-13", "peakHour": "18:00-19:00"}
+TIMESTAMP = datetime.datetime(2024, 6, 13, 18, 0)
+
+class RecordingCollection:
+    # Stands in for a collection and keeps what bulk_write was called with
+    def __init__(self, collection):
+        self.collection = collection
+        self.database = collection.database
+        self.name = collection.name
+        self.bulk_calls = []
+
+    def create_index(self, *args, **kwargs):
+        return self.collection.create_index(*args, **kwargs)
+
+    def bulk_write(self, operations, ordered=True):
+        self.bulk_calls.append((operations, ordered))
+        return "result"
+
+@pytest.fixture
+def collection():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient()[summary_store.DB_NAME][summary_store.COLLECTION_NAME]
+
+def test_store_summary_upserts_one_document_per_city_and_model(collection):
+    summary_store.store_summary("EL PASO", "fast", SUMMARY, collection)
+    summary_store.store_summary("EL PASO", "fast", dict(SUMMARY, expectedUsage=2.0), collection)
+    summary_store.store_summary("EL PASO", "hybrid", SUMMARY, collection)
+
+    assert collection.count_documents({}) == 2
+    assert collection.find_one({"city": "EL PASO", "modelType": "fast"})["expectedUsage"] == 2.0
+
+def test_optional_fields_are_stored_only_when_present(collection):
+    summary_store.store_summary("EL PASO", "fast", SUMMARY, collection)
+    summary_store.store_summary("EL PASO", "hybrid", dict(SUMMARY, modelVersion={"lgb": "lgb_hybrid@1"}), collection)
+
+    assert "modelVersion" not in collection.find_one({"modelType": "fast"})
+    assert collection.find_one({"modelType": "hybrid"})["modelVersion"] == {"lgb": "lgb_hybrid@1"}
+
+def test_summary_operations_are_keyed_upserts():
+    operations = summary_store.summary_operations(
+        [("EL PASO", "hybrid", SUMMARY), ("DALLAS", "fast", dict(SUMMARY, modelVersion={"lgb": "v1"}))],
+        timestamp=TIMESTAMP
+    )
+
+    assert operations == [
+        ReplaceOne({"city": "EL PASO", "modelType": "hybrid"},
+                   {"city": "EL PASO", "modelType": "hybrid", **SUMMARY, "timestamp": TIMESTAMP},
+                   upsert=True),
+        ReplaceOne({"city": "DALLAS", "modelType": "fast"},
+                   {"city": "DALLAS", "modelType": "fast", **SUMMARY, "modelVersion": {"lgb": "v1"},
+                    "timestamp": TIMESTAMP},
+                   upsert=True),
+    ]
+
+def test_store_summaries_sends_one_unordered_bulk_write(collection):
+    recording = RecordingCollection(collection)
+    entries = [("EL PASO", "hybrid", SUMMARY), ("DALLAS", "fast", SUMMARY)]
+
+    assert summary_store.store_summaries(entries, recording) == "result"
+
+    [(operations, ordered)] = recording.bulk_calls
+    assert ordered is False
+    assert len(operations) == 2
+    assert all(isinstance(operation, ReplaceOne) for operation in operations)
+    assert summary_store.store_summaries([], recording) is None
+    assert len(recording.bulk_calls) == 1
+
+def test_store_summaries_against_mongod():
+    # Runs the real bulk_write path when a mongod is reachable (WATTWISE_MONGO_URI)
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(summary_store.MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("no mongod reachable")
+
+    collection = client[f"{summary_store.DB_NAME}_test_{os.getpid()}"][summary_store.COLLECTION_NAME]
+    try:
+        summary_store.store_summary("EL PASO", "hybrid", SUMMARY, collection)
+        result = summary_store.store_summaries(
+            [("EL PASO", "hybrid", dict(SUMMARY, expectedUsage=2.0)), ("DALLAS", "fast", SUMMARY)], collection
+        )
+        assert (result.matched_count, result.upserted_count) == (1, 1)
+        assert collection.count_documents({}) == 2
+        assert collection.find_one({"city": "EL PASO"})["expectedUsage"] == 2.0
+    finally:
+        client.drop_database(collection.database.name)
@@ -268,7 +268,7 @@ const AnalysisScreen = ({ darkMode }) => {
       console.log('Prediction response:', result);
   
       // 🔽 Fetch summary data from MongoDB model_specs
-      const summaryRes = await fetch(`http://localhost:5000/api/model-specs/${city}`);
+      const summaryRes = await fetch(`http://localhost:5000/api/model-specs/${city}?modelType=${modelType}`);
       const summary = await summaryRes.json();
   
       if (summary && summary.expectedUsage) {